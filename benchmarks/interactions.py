@@ -0,0 +1,540 @@
+"""Drives synthetic slash command interactions through the bot under load.
+
+Fake interaction payloads are built for a mix of tag and warn commands and
+run through BetterCommandTree and the real cogs, backed by an in-memory
+SQLite database. Nothing connects to Discord: interaction responses and
+REST calls are answered by stubs, optionally after a simulated round trip.
+
+    python -m benchmarks.interactions --rate 200 --duration 10
+    python -m benchmarks.interactions --rate 1000 --concurrency 200 --save raid
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import string
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from discord import (
+    ClientUser,
+    DiscordException,
+    Guild,
+    Interaction,
+    Permissions,
+    __version__ as discord_version,
+)
+from discord.webhook.async_ import async_context
+
+from bot import Bot
+
+from .utils import Results, load_baseline, report, save_baseline, summarise
+
+# The benchmark drives discord.py internals, such as CommandTree._call and
+# Bot._async_setup_hook, which can change in any release.
+DISCORD_VERSION = "2.7.1"
+
+APPLICATION_ID = 1
+BOT_USER_ID = 2
+GUILDS = 20
+USERS_PER_GUILD = 200
+TAGS_PER_GUILD = 100
+
+_ids = itertools.count(10**17)
+
+
+def snowflake() -> str:
+    return str(next(_ids))
+
+
+def user_payload(user_id: int, *, bot: bool = False) -> Dict[str, Any]:
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user_id: int, roles: List[int]) -> Dict[str, Any]:
+    return {
+        "user": user_payload(user_id, bot=user_id == BOT_USER_ID),
+        "roles": [str(role) for role in roles],
+        "joined_at": datetime.now(timezone.utc).isoformat(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def message_payload(channel_id: str, content: str = "") -> Dict[str, Any]:
+    return {
+        "id": snowflake(),
+        "channel_id": channel_id,
+        "author": user_payload(BOT_USER_ID, bot=True),
+        "content": content,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+
+class FakeGuild:
+    """The IDs making up one synthetic guild: a moderator role above a
+    member role, with the bot's role above both"""
+
+    def __init__(self, bot: Bot, index: int):
+        self.id = 10**6 + index
+        self.owner_id = 10**7 + index
+        self.bot_role, self.moderator_role, self.member_role = (
+            int(snowflake()) for _ in range(3)
+        )
+        self.moderator = int(snowflake())
+        self.users = [int(snowflake()) for _ in range(USERS_PER_GUILD)]
+        self.tags = [
+            "".join(random.choices(string.ascii_lowercase, k=8))
+            for _ in range(TAGS_PER_GUILD)
+        ]
+
+        def role(role_id: int, position: int, permissions: Permissions):
+            return {
+                "id": str(role_id),
+                "name": str(role_id),
+                "color": 0,
+                "hoist": False,
+                "position": position,
+                "permissions": str(permissions.value),
+                "managed": False,
+                "mentionable": False,
+                "flags": 0,
+            }
+
+        guild = Guild(
+            data={
+                "id": str(self.id),
+                "name": f"Guild {index}",
+                "owner_id": str(self.owner_id),
+                "roles": [
+                    role(self.id, 0, Permissions.none()),
+                    role(self.member_role, 1, Permissions.none()),
+                    role(self.moderator_role, 2, Permissions(moderate_members=True)),
+                    role(self.bot_role, 3, Permissions.all()),
+                ],
+                "members": [member_payload(BOT_USER_ID, [self.bot_role])],
+                "member_count": USERS_PER_GUILD + 2,
+            },  # type: ignore
+            state=bot._connection,
+        )
+        bot._connection._add_guild(guild)
+
+
+class StubAdapter:
+    """Answers interaction responses in place of Discord's webhook API,
+    recording when each interaction was first responded to"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.first_response: Dict[int, float] = {}
+
+    async def _respond(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def create_interaction_response(self, interaction_id, token, **kwargs):
+        self.first_response.setdefault(interaction_id, perf_counter())
+        await self._respond()
+        return {"interaction": {"id": str(interaction_id), "type": 2}}
+
+    async def edit_original_interaction_response(self, application_id, token, **kw):
+        await self._respond()
+        return message_payload(snowflake())
+
+    async def get_original_interaction_response(self, application_id, token, **kw):
+        await self._respond()
+        return message_payload(snowflake())
+
+    async def delete_original_interaction_response(self, application_id, token, **kw):
+        await self._respond()
+
+
+class StubHTTP:
+    """Answers the REST calls made outside of interaction responses, such as
+    opening DM channels, sending DMs and timing members out"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    async def request(self, route, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if route.path == "/users/@me/channels":
+            recipient = kwargs.get("json", {}).get("recipient_id", 0)
+            return {
+                "id": snowflake(),
+                "type": 1,
+                "recipients": [user_payload(int(recipient))],
+            }
+        elif route.path.endswith("/messages"):
+            return message_payload(str(route.channel_id))
+        elif "/members/" in route.path:
+            # route.path is the template, the formatted url has the member's id.
+            return member_payload(int(route.url.rsplit("/", 1)[-1]), [])
+
+        return {}
+
+
+class LoadGenerator:
+    def __init__(self, bot: Bot, guilds: List[FakeGuild], adapter: StubAdapter):
+        self.bot = bot
+        self.guilds = guilds
+        self.adapter = adapter
+
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_responses: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.loop_lag: List[float] = []
+
+    def interaction(
+        self,
+        guild: FakeGuild,
+        command: str,
+        subcommand: Optional[str],
+        options: List[Dict[str, Any]],
+        *,
+        autocomplete: bool = False,
+        target: Optional[int] = None,
+    ) -> Interaction:
+        member = member_payload(guild.moderator, [guild.moderator_role])
+        member["permissions"] = str(
+            Permissions(manage_messages=True, moderate_members=True).value
+        )
+        data: Dict[str, Any] = {
+            "id": snowflake(),
+            "name": command,
+            "type": 1,
+            "options": (
+                [{"type": 1, "name": subcommand, "options": options}]
+                if subcommand
+                else options
+            ),
+        }
+
+        if target is not None:
+            target_member = member_payload(target, [guild.member_role])
+            data["resolved"] = {
+                "users": {str(target): target_member.pop("user")},
+                "members": {str(target): target_member},
+            }
+
+        return Interaction(
+            data={
+                "id": snowflake(),
+                "application_id": str(APPLICATION_ID),
+                "type": 4 if autocomplete else 2,
+                "token": "token",
+                "version": 1,
+                "guild_id": str(guild.id),
+                "member": member,
+                "app_permissions": str(Permissions.all().value),
+                "locale": "en-US",
+                "attachment_size_limit": 8 * 1024 * 1024,
+                "data": data,
+            },  # type: ignore
+            state=self.bot._connection,
+        )
+
+    def random_interaction(self, rng: random.Random) -> tuple:
+        guild = rng.choice(self.guilds)
+        tag = rng.choice(guild.tags)
+        user = rng.choice(guild.users)
+
+        def option(name: str, value: Any, type: int = 3, **extra):
+            return {"type": type, "name": name, "value": value, **extra}
+
+        scenarios: List[tuple] = [
+            (
+                30,
+                "tags autocomplete",
+                lambda: self.interaction(
+                    guild,
+                    "tags",
+                    "edit",
+                    [option("name", tag[: rng.randint(0, 3)], focused=True)],
+                    autocomplete=True,
+                ),
+            ),
+            (
+                10,
+                "tags create",
+                lambda: self.interaction(
+                    guild,
+                    "tags",
+                    "create",
+                    [option("name", tag + snowflake()), option("content", "x" * 200)],
+                ),
+            ),
+            (
+                25,
+                "tags edit",
+                lambda: self.interaction(
+                    guild,
+                    "tags",
+                    "edit",
+                    [option("name", tag), option("content", "y" * 200)],
+                ),
+            ),
+            (
+                20,
+                "warns add",
+                lambda: self.interaction(
+                    guild,
+                    "warns",
+                    "add",
+                    [option("user", str(user), 6), option("reason", "spam")],
+                    target=user,
+                ),
+            ),
+            (
+                10,
+                "warns list",
+                lambda: self.interaction(
+                    guild,
+                    "warns",
+                    "list",
+                    [option("user", str(user), 6)],
+                    target=user,
+                ),
+            ),
+            (
+                5,
+                "warns stats",
+                lambda: self.interaction(
+                    guild,
+                    "warns",
+                    "stats",
+                    [option("user", str(user), 6)],
+                    target=user,
+                ),
+            ),
+            (
+                5,
+                "mute",
+                lambda: self.interaction(
+                    guild,
+                    "mute",
+                    None,
+                    [
+                        option("user", str(user), 6),
+                        option("reason", "spam"),
+                        option("minutes", 10, 4),
+                    ],
+                    target=user,
+                ),
+            ),
+        ]
+        _, name, build = rng.choices(
+            scenarios, weights=[weight for weight, *_ in scenarios]
+        )[0]
+        return name, build
+
+    async def dispatch(
+        self,
+        name: str,
+        build: Callable[[], Interaction],
+        start: float,
+    ):
+        interaction = build()
+
+        try:
+            await self.bot.tree._call(interaction)
+        except DiscordException as error:
+            # Command errors are handled by the tree, so only failures to
+            # respond to them get this far.
+            self.errors[f"{name}: {type(error).__name__}"] += 1
+        else:
+            if interaction.command_failed:
+                self.errors[f"{name}: handled error"] += 1
+
+        end = perf_counter()
+        self.latencies[name].append(end - start)
+
+        responded = self.adapter.first_response.pop(interaction.id, None)
+
+        if responded is not None:
+            self.first_responses[name].append(responded - start)
+
+    async def measure_loop_lag(self, interval: float = 0.01):
+        while True:
+            start = perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.append(perf_counter() - start - interval)
+
+    async def run(self, rate: float, duration: float, concurrency: int, seed: int):
+        """Starts interactions at ``rate`` per second for ``duration`` seconds,
+        with at most ``concurrency`` in flight. Interactions that can't start
+        on schedule because of the concurrency limit are started late, so the
+        measured latency includes the time spent queued."""
+        rng = random.Random(seed)
+        limit = asyncio.Semaphore(concurrency)
+        lag = asyncio.create_task(self.measure_loop_lag())
+        tasks = []
+
+        async def limited(name, build, scheduled):
+            async with limit:
+                await self.dispatch(name, build, scheduled)
+
+        start = perf_counter()
+
+        for i in range(int(rate * duration)):
+            delay = start + i / rate - perf_counter()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            name, build = self.random_interaction(rng)
+            tasks.append(asyncio.create_task(limited(name, build, start + i / rate)))
+
+        await asyncio.gather(*tasks)
+        elapsed = perf_counter() - start
+        lag.cancel()
+
+        return elapsed, len(tasks)
+
+
+async def main(args: argparse.Namespace) -> Results:
+    bot = Bot(
+        {
+            "storage": "sqlite",
+            "notifications": {"maxsize": 10000},
+            "ratelimits": {} if args.ratelimits else False,
+            "escalation": (
+                {"warns": 3, "window": 3600, "timeout": 600}
+                if args.escalation
+                else None
+            ),
+        }
+    )
+    await bot._async_setup_hook()
+
+    http = StubHTTP(args.http_latency / 1000)
+    bot.http.request = http.request  # type: ignore
+    adapter = StubAdapter(args.http_latency / 1000)
+    async_context.set(adapter)  # type: ignore
+
+    bot._connection.user = ClientUser(
+        state=bot._connection,
+        data=user_payload(BOT_USER_ID, bot=True),  # type: ignore
+    )
+    bot._connection.application_id = APPLICATION_ID
+
+    await bot.storage.setup()
+    bot.notifications.start()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    guilds = [FakeGuild(bot, i) for i in range(GUILDS)]
+
+    for guild in guilds:
+        for name in guild.tags:
+            await bot.tags.create(
+                {
+                    "guild": guild.id,
+                    "name": name,
+                    "_name": name,
+                    "content": "x" * rng.randint(20, 2000),
+                    "author": guild.moderator,
+                }
+            )
+
+    for extension in ("cogs.Tags", "cogs.Moderation"):
+        await bot.load_extension(extension)
+
+    generator = LoadGenerator(bot, guilds, adapter)
+    elapsed, count = await generator.run(
+        args.rate, args.duration, args.concurrency, args.seed
+    )
+
+    await bot.notifications.stop()
+    await bot.storage.close()
+
+    results: Results = {}
+
+    for name, latencies in sorted(generator.latencies.items()):
+        results[f"{name} (total)"] = summarise(latencies)
+
+    for name, latencies in sorted(generator.first_responses.items()):
+        results[f"{name} (first response)"] = summarise(latencies)
+
+    results["event loop lag"] = summarise(generator.loop_lag)
+
+    print(
+        f"{count} interactions in {elapsed:.2f}s "
+        f"({count / elapsed:.1f}/s, target {args.rate:.1f}/s)"
+    )
+
+    for error, occurrences in sorted(generator.errors.items()):
+        print(f"{occurrences} x {error}")
+
+    for call, occurrences in sorted(http.calls.items()):
+        print(f"{occurrences} x {call}")
+
+    return results
+
+
+if __name__ == "__main__":
+    if discord_version != DISCORD_VERSION:
+        print(
+            f"Skipping: written against discord.py {DISCORD_VERSION}, "
+            f"but {discord_version} is installed"
+        )
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=100, help="Interactions/sec")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--http-latency",
+        type=float,
+        default=50,
+        help="Simulated Discord round trip in milliseconds",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--ratelimits",
+        action="store_true",
+        help="Keep the commands' rate limits, which reject most of the load",
+    )
+    parser.add_argument(
+        "--escalation",
+        action="store_true",
+        help="Time users out after three warns, as the escalation policy would",
+    )
+    parser.add_argument("--save", metavar="NAME", help="Save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare to a baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    print(report(results, load_baseline(args.compare) if args.compare else None))
+
+    if args.save:
+        print(f"Saved baseline to {save_baseline(args.save, results)}")
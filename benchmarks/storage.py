@@ -0,0 +1,248 @@
+"""Benchmarks the storage operations behind the tag and warn commands.
+
+Each benchmark issues the same repository calls as the command it is named
+after, against a database pre-filled with documents spread over many guilds.
+By default the in-process SQLite backend is used as the stand-in database;
+pass ``--mongo-url`` to run against a scratch database on a MongoDB server.
+
+    python -m benchmarks.storage --sizes 1000 10000 100000 1000000
+    python -m benchmarks.storage --save before-cache
+    python -m benchmarks.storage --compare before-cache
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import string
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from bot.storage import Storage, Tag, Warn
+
+from .utils import Results, load_baseline, report, save_baseline, summarise
+
+GUILDS = 100
+USERS_PER_GUILD = 50
+
+
+def random_name(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 16)))
+
+
+def make_tag(rng: random.Random, guild_id: int, name: str) -> Tag:
+    return Tag(
+        guild=guild_id,
+        name=name,
+        _name=name.lower(),
+        content="x" * rng.randint(20, 2000),
+        author=rng.randrange(10**17, 10**18),
+    )
+
+
+def make_warn(rng: random.Random, guild_id: int, user_id: int) -> Warn:
+    return Warn(
+        guild=guild_id,
+        user=user_id,
+        reason="x" * rng.randint(10, 256),
+        moderator=rng.randrange(10**17, 10**18),
+        warn_id="".join(rng.choices(string.ascii_letters + string.digits, k=16)),
+    )
+
+
+async def measure(
+    operation: Callable[[int], Awaitable[object]],
+    iterations: int,
+) -> Tuple[List[float], float]:
+    """Runs an operation ``iterations`` times in a row, returning the latency
+    of each run and the wall-clock time taken by all of them"""
+    latencies = []
+    began = perf_counter()
+
+    for i in range(iterations):
+        start = perf_counter()
+        await operation(i)
+        latencies.append(perf_counter() - start)
+
+    return latencies, perf_counter() - began
+
+
+async def populate(storage: Storage, rng: random.Random, size: int) -> List[Tag]:
+    """Fills the database with ``size`` tags and ``size`` warns, returning the
+    tags created"""
+    tags = []
+
+    for i in range(size):
+        tag = make_tag(rng, i % GUILDS, f"{random_name(rng)}{i}")
+        await storage.tags.create(tag)
+        tags.append(tag)
+
+    batch: List[Warn] = []
+
+    for i in range(size):
+        guild_id = i % GUILDS
+        batch.append(make_warn(rng, guild_id, rng.randrange(USERS_PER_GUILD)))
+
+        if len(batch) == 1000:
+            await storage.warns.add_many(batch)
+            batch = []
+
+    if batch:
+        await storage.warns.add_many(batch)
+
+    return tags
+
+
+async def run(storage: Storage, size: int, iterations: int, seed: int) -> Results:
+    rng = random.Random(seed)
+    await storage.setup()
+
+    tags = await populate(storage, rng, size)
+    results: Results = {}
+
+    def record(name: str, measured: Tuple[List[float], float]):
+        results[f"{name}[{size}]"] = summarise(*measured)
+
+    # Tags.create_tag: one atomic insert that may hit the unique index.
+    created = [
+        make_tag(rng, rng.randrange(GUILDS), f"new{random_name(rng)}{i}")
+        for i in range(iterations)
+    ]
+    record(
+        "tags.create",
+        await measure(lambda i: storage.tags.create(created[i]), iterations),
+    )
+
+    # Tags.get_tag on a cache miss, as done first by edit_tag and delete_tag.
+    hits = rng.sample(tags, min(iterations, len(tags)))
+    record(
+        "tags.get",
+        await measure(
+            lambda i: storage.tags.get(hits[i]["guild"], hits[i]["name"]),
+            len(hits),
+        ),
+    )
+    record(
+        "tags.get (miss)",
+        await measure(
+            lambda i: storage.tags.get(rng.randrange(GUILDS), random_name(rng)),
+            iterations,
+        ),
+    )
+
+    # Tags.edit_tag and Tags.delete_tag.
+    record(
+        "tags.update_content",
+        await measure(
+            lambda i: storage.tags.update_content(
+                hits[i]["guild"], hits[i]["_name"], "edited"
+            ),
+            len(hits),
+        ),
+    )
+    record(
+        "tags.delete",
+        await measure(
+            lambda i: storage.tags.delete(hits[i]["guild"], hits[i]["_name"]),
+            len(hits),
+        ),
+    )
+
+    # Moderation.warns_add, including the escalation policy's count.
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+
+    async def add_warn(_):
+        guild_id, user_id = rng.randrange(GUILDS), rng.randrange(USERS_PER_GUILD)
+        await storage.warns.add(make_warn(rng, guild_id, user_id))
+        await storage.warns.count_since(guild_id, user_id, since, limit=3)
+
+    record("warns.add", await measure(add_warn, iterations))
+
+    # Moderation.warns_list: the first page and the page after it.
+    async def list_warns(_):
+        guild_id, user_id = rng.randrange(GUILDS), rng.randrange(USERS_PER_GUILD)
+        page = await storage.warns.page(guild_id, user_id, limit=6)
+
+        if len(page) > 5:
+            await storage.warns.page(guild_id, user_id, after=page[4]["_id"], limit=6)
+
+    record("warns.page", await measure(list_warns, iterations))
+
+    # Moderation.warns_stats.
+    record(
+        "warns.stats",
+        await measure(
+            lambda _: storage.warns.stats(
+                rng.randrange(GUILDS), rng.randrange(USERS_PER_GUILD), since
+            ),
+            iterations,
+        ),
+    )
+
+    # Moderation.warns_clear, on a different user each time.
+    users = [
+        (guild_id, user_id)
+        for guild_id in range(GUILDS)
+        for user_id in range(USERS_PER_GUILD)
+    ]
+    rng.shuffle(users)
+    users = users[:iterations]
+    record(
+        "warns.clear",
+        await measure(lambda i: storage.warns.clear(*users[i]), len(users)),
+    )
+
+    return results
+
+
+def create(mongo_url: Optional[str]) -> Storage:
+    if mongo_url:
+        from bot.storage.mongo import MongoStorage
+
+        return MongoStorage(mongo_url, database="benchmark")
+
+    from bot.storage.sqlite import SQLiteStorage
+
+    return SQLiteStorage()
+
+
+async def main(args: argparse.Namespace) -> Results:
+    results: Results = {}
+
+    for size in args.sizes:
+        storage = create(args.mongo_url)
+
+        try:
+            results.update(await run(storage, size, args.iterations, args.seed))
+        finally:
+            if args.mongo_url:
+                await storage.client.drop_database("benchmark")  # type: ignore
+
+            await storage.close()
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of tags and of warns to fill the database with",
+    )
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-url", help="Benchmark MongoDB instead of SQLite")
+    parser.add_argument("--save", metavar="NAME", help="Save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare to a baseline")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    print(report(results, load_baseline(args.compare) if args.compare else None))
+
+    if args.save:
+        print(f"Saved baseline to {save_baseline(args.save, results)}")
@@ -0,0 +1,91 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+Results = Dict[str, Dict[str, float]]
+
+
+def summarise(
+    latencies: List[float], wall_seconds: Optional[float] = None
+) -> Dict[str, float]:
+    """Summarises a list of per-operation latencies in seconds, with the
+    throughput over ``wall_seconds`` if the operations were timed as a whole"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    summary = {
+        "ops": len(ordered),
+        "mean_ms": total / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(0.50) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+    }
+
+    if wall_seconds:
+        summary["ops_per_sec"] = len(ordered) / wall_seconds
+
+    return summary
+
+
+def save_baseline(name: str, results: Results) -> str:
+    """Stores results as the named baseline, returning its path"""
+    os.makedirs(BASELINES, exist_ok=True)
+    path = os.path.join(BASELINES, f"{name}.json")
+
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+    return path
+
+
+def load_baseline(name: str) -> Optional[Results]:
+    path = os.path.join(BASELINES, f"{name}.json")
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def report(results: Results, baseline: Optional[Results] = None) -> str:
+    """Formats results as a table, with the change in throughput and p50
+    latency against a baseline if one is given"""
+    lines = [
+        (
+            f"{'benchmark':<40} {'ops/sec':>10} {'mean ms':>10}"
+            f" {'p50 ms':>10} {'p99 ms':>10}"
+        )
+        + (f" {'Δ ops/sec':>10} {'Δ p50':>10}" if baseline else "")
+    ]
+
+    for name, result in results.items():
+        throughput = result.get("ops_per_sec")
+        line = (
+            f"{name:<40} "
+            + (f"{throughput:>10.1f} " if throughput else f"{'-':>10} ")
+            + f"{result['mean_ms']:>10.3f} {result['p50_ms']:>10.3f}"
+            f" {result['p99_ms']:>10.3f}"
+        )
+
+        if baseline and name in baseline:
+            before = baseline[name]
+            line += (
+                f" {_change(before.get('ops_per_sec', 0), throughput or 0):>10}"
+                f" {_change(before['p50_ms'], result['p50_ms']):>10}"
+            )
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+
+    return f"{(after - before) / before:+.1%}"
@@ -1,42 +1,246 @@
+import asyncio
 import json
+import logging
 import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, cast
 
-from discord import Intents
-from discord.ext.commands import Bot as DBot
+from discord import Intents, Member, MemberCacheFlags
+from discord.ext.commands import AutoShardedBot
 from discord.ext.commands import when_mentioned
-from motor.motor_asyncio import AsyncIOMotorClient
 
+from cogs.utils import RateLimiter, TTLCache
+
+from .metrics import MetricsServer, TimedRepository
+from .notifications import NotificationQueue
+from .scheduler import Scheduler
+from .startup import StartupProfiler
+from .storage import Tag, TagRepository, WarnRepository, create_storage
 from .tree import BetterCommandTree
+from .usage import UsageCounter
+
+log = logging.getLogger(__name__)
+
+IDENTIFY_INTERVAL = 5.5
+
+
+def discover_cogs() -> List[str]:
+    """Finds every extension in the cogs folder"""
+    return [
+        f"cogs.{file_[:-3]}" for file_ in os.listdir("./cogs") if file_.endswith(".py")
+    ]
+
 
+class Bot(AutoShardedBot):
+    """The bot, which can serve any number of shards.
+
+    By default every shard is served by this process, using the number of
+    shards Discord recommends. "shard_count" and "shard_ids" in the config
+    pick which shards this process serves, as set by the launcher in
+    bot.cluster when the bot is spread across processes.
+
+    Each guild belongs to exactly one shard, so per-guild caches such as the
+    tag cache and the tag name indexes only ever see changes made by this
+    process. Anything shared between guilds lives in the database."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.startup = StartupProfiler()
+        if config is None:
+            with self.startup.phase("config"), open("config.json") as f:
+                config = json.load(f)
+
+        self.config = config
 
-class Bot(DBot):
-    def __init__(self):
         intents = Intents()
         intents.guilds = True
-        intents.members = True
+        # Needed to chunk a guild on demand and to see updates to the bot's
+        # own roles, which the hierarchy checks rely on.
+        intents.members = self.config.get("members_intent", True)
 
-        super().__init__(
-            intents=intents,
-            command_prefix=when_mentioned,
-            tree_cls=BetterCommandTree,
-        )
-        self.config = json.load(open("config.json"))
+        # Members given as command arguments come with the interaction, so by
+        # default no members are cached and guilds are not chunked at startup.
+        member_cache_flags = MemberCacheFlags.none()
+        for flag, enabled in self.config.get("member_cache", {}).items():
+            setattr(member_cache_flags, flag, enabled)
+
+        with self.startup.phase("client"):
+            super().__init__(
+                intents=intents,
+                command_prefix=when_mentioned,
+                tree_cls=BetterCommandTree,
+                member_cache_flags=member_cache_flags,
+                chunk_guilds_at_startup=self.config.get(
+                    "chunk_guilds_at_startup", False
+                ),
+                shard_count=self.config.get("shard_count"),
+                shard_ids=self.config.get("shard_ids"),
+            )
         self.tree: BetterCommandTree
-        cluster = AsyncIOMotorClient(self.config["mongo_url"])
+        with self.startup.phase("storage client"):
+            self.storage = create_storage(self.config)
 
-        self.tags = cluster["bot"]["tags"]
-        self.warns = cluster["bot"]["warns"]
+        # Time spent in the repositories is counted towards the database time
+        # of the command being run.
+        self.tags = cast(TagRepository, TimedRepository(self.storage.tags))
+        self.warns = cast(WarnRepository, TimedRepository(self.storage.warns))
+
+        self.tag_cache: TTLCache[Tag] = TTLCache(
+            maxsize=self.config.get("tag_cache_size", 1024),
+            ttl=self.config.get("tag_cache_ttl", 300),
+        )
+        # Members fetched by ID for moderation commands, kept briefly so the
+        # same targets aren't fetched again by a follow-up command.
+        self.member_cache: TTLCache[Member] = TTLCache(
+            maxsize=self.config.get("member_cache_size", 1024),
+            ttl=self.config.get("member_cache_ttl", 60),
+        )
+        # Set to false to turn every rate limit off, e.g. for benchmarks.
+        ratelimits = self.config.get("ratelimits", {})
+        self.ratelimits = RateLimiter(
+            ratelimits or {},
+            enabled=ratelimits is not False,
+            workers=self.config.get("ratelimit_workers", 1),
+        )
+        self.notifications = NotificationQueue(
+            **self.config.get("notifications", {}),
+        )
+        self.tag_uses = UsageCounter(
+            self.storage.tags,
+            **self.config.get("tag_uses", {}),
+        )
+        self.scheduler = Scheduler(
+            self,
+            self.storage.jobs,
+            **self.config.get("scheduler", {}),
+        )
+        self._deferred_load: Optional[asyncio.Task[None]] = None
+        self.metrics_server: Optional[MetricsServer] = (
+            MetricsServer(self, **self.config["metrics"])
+            if "metrics" in self.config
+            else None
+        )
 
     def reload_config(self):
         with open("config.json") as f:
             self.config = json.load(f)
 
+    def gauges(self) -> Dict[str, Dict[str, float]]:
+        """Gets the counters of the bot's caches and queues"""
+        return {
+            "tag_cache": self.tag_cache.stats(),
+            "member_cache": self.member_cache.stats(),
+            "ratelimits": self.ratelimits.stats(),
+            "notifications": self.notifications.stats(),
+            "tag_uses": self.tag_uses.stats(),
+        }
+
     async def setup_hook(self) -> None:
-        await self.tree.fetch_commands()
-        await self.load_extension("jishaku")
-        for file_ in os.listdir("./cogs"):
-            if file_.endswith(".py"):
-                await self.load_extension(f"cogs.{file_[:-3]}")
+        self.notifications.start()
+        self.tag_uses.start()
+        if self.metrics_server:
+            await self.metrics_server.start()
+        with self.startup.phase("storage setup"):
+            await self.storage.setup()
+
+        # "extensions" lists the extensions loaded before connecting, and
+        # "deferred_extensions" those that can wait until after READY. Without
+        # a manifest, jishaku and every cog are loaded before connecting.
+        await self.load_extensions(
+            self.config.get("extensions", ["jishaku", *discover_cogs()])
+        )
+        deferred = self.config.get("deferred_extensions", [])
+
+        if deferred:
+            self._deferred_load = asyncio.create_task(self.load_deferred(deferred))
+        else:
+            await self.load_commands()
+            # Started once every extension has registered its job handlers.
+            self.scheduler.start()
+
+    async def load_extensions(self, names: Iterable[str]) -> None:
+        """Loads extensions concurrently, so one extension waiting on the
+        database in its cog_load doesn't hold up the others"""
+
+        async def load(name: str) -> None:
+            with self.startup.phase(f"extension {name}"):
+                await self.load_extension(name)
+
+        await asyncio.gather(*(load(name) for name in names))
+
+    async def load_deferred(self, names: List[str]) -> None:
+        """Loads the extensions that aren't needed before the bot is ready"""
+        await self.wait_until_ready()
+
+        try:
+            await self.load_extensions(names)
+            await self.load_commands()
+        except Exception:
+            log.exception("Failed to load deferred extensions")
+
+        self.scheduler.start()
+
+        self.startup.finish(self.config.get("startup_reports", "startup.jsonl"))
+
+    async def load_commands(self) -> None:
+        # Needs every command to be added to the tree first, to tell whether
+        # they have changed since they were last synced.
+        with self.startup.phase("application commands"):
+            await self.tree.load_commands(
+                self.config.get("command_cache", "commands.json"),
+                sync=self.config.get("sync_commands", True),
+            )
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether a guild is served by one of this process's shards"""
+        if self.shard_count is None or self.shard_ids is None:
+            return True
+
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
+    async def before_identify_hook(
+        self, shard_id: Optional[int], *, initial: bool = False
+    ):
+        if initial:
+            self.startup.mark("gateway connect")
+
+        # When launched as a cluster, every process starts identifying at the
+        # same time, so each shard waits for its own slot in Discord's
+        # identify rate limit instead of relying on the per-process pacing.
+        identify_start = self.config.get("identify_start")
+
+        if identify_start is not None and shard_id is not None:
+            slot = shard_id // self.config.get("max_concurrency", 1)
+            delay = identify_start + slot * IDENTIFY_INTERVAL - time.time()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+                return
+
+        await super().before_identify_hook(shard_id, initial=initial)
+
+    async def on_connect(self) -> None:
+        # Dispatched for every shard and again on every reconnect, so only
+        # the first connection is a startup milestone.
+        if not self.startup.finished:
+            self.startup.mark("READY", once=True)
+
+    async def on_ready(self) -> None:
+        if not self.startup.finished:
+            self.startup.mark("guilds and chunking")
+
+        if self._deferred_load is None:
+            self.startup.finish(self.config.get("startup_reports", "startup.jsonl"))
+
+    async def close(self) -> None:
+        if self._deferred_load:
+            self._deferred_load.cancel()
+        await self.scheduler.stop()
+        await self.notifications.stop()
+        await self.tag_uses.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await super().close()
+        await self.storage.close()
 
     def run(self):
         super().run(self.config["token"])
@@ -0,0 +1,147 @@
+"""Runs the bot as several processes, each serving a range of shards.
+
+Every process reads the same config.json, serves the guilds on its own
+shards and talks to the same database, so the cluster behaves like a single
+bot spread over several cores.
+
+    python -m bot.cluster --processes 4
+    python -m bot.cluster --processes 4 --shards 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from typing import Any, Dict, List, Tuple
+
+from discord.http import HTTPClient
+
+log = logging.getLogger(__name__)
+
+RESTART_DELAY = 10.0
+
+
+def shard_ranges(shard_count: int, processes: int) -> List[List[int]]:
+    """Splits the shards into contiguous ranges of near equal size"""
+    size, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+
+    for index in range(processes):
+        end = start + size + (index < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return [shards for shards in ranges if shards]
+
+
+async def fetch_gateway(token: str) -> Tuple[int, int]:
+    """Gets the recommended number of shards and how many shards may
+    identify at the same time"""
+    http = HTTPClient(asyncio.get_running_loop())
+
+    try:
+        await http.static_login(token)
+        shards, _, limit = await http.get_bot_gateway()
+    finally:
+        await http.close()
+
+    return shards, limit["max_concurrency"]
+
+
+def worker_config(
+    config: Dict[str, Any],
+    index: int,
+    shard_ids: List[int],
+    shard_count: int,
+    max_concurrency: int,
+) -> Dict[str, Any]:
+    """The config for one process of the cluster"""
+    worker = {
+        **config,
+        "shard_ids": shard_ids,
+        "shard_count": shard_count,
+        "identify_start": time.time(),
+        "max_concurrency": max_concurrency,
+        # Only one process needs to sync the application commands, and only
+        # the process that syncs writes the shared command cache.
+        "sync_commands": index == 0 and config.get("sync_commands", True),
+        "startup_reports": f"startup-{index}.jsonl",
+    }
+
+    if "metrics" in config:
+        metrics = config["metrics"]
+        worker["metrics"] = {**metrics, "port": metrics.get("port", 9100) + index}
+
+    return worker
+
+
+def run_worker(config: Dict[str, Any]) -> None:
+    from .bot import Bot
+
+    Bot(config).run()
+
+
+def main(args: argparse.Namespace) -> None:
+    with open("config.json") as f:
+        config = json.load(f)
+
+    if config.get("storage") == "sqlite" and config.get("sqlite_path") in (
+        None,
+        ":memory:",
+    ):
+        raise SystemExit("Each process would get its own in-memory database")
+
+    shard_count, max_concurrency = asyncio.run(fetch_gateway(config["token"]))
+    shard_count = args.shards or max(shard_count, args.processes)
+    ranges = shard_ranges(shard_count, args.processes)
+
+    context = multiprocessing.get_context("spawn")
+    workers = {}
+
+    for index, shard_ids in enumerate(ranges):
+        worker = worker_config(config, index, shard_ids, shard_count, max_concurrency)
+        workers[index] = (worker, context.Process(target=run_worker, args=(worker,)))
+        workers[index][1].start()
+        log.info("Started process %s with shards %s", index, shard_ids)
+
+    try:
+        while True:
+            time.sleep(RESTART_DELAY)
+
+            for index, (worker, process) in workers.items():
+                if process.is_alive():
+                    continue
+
+                log.warning(
+                    "Process %s exited with code %s, restarting it",
+                    index,
+                    process.exitcode,
+                )
+                process = context.Process(target=run_worker, args=(worker,))
+                process.start()
+                workers[index] = (worker, process)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for _, process in workers.values():
+            process.terminate()
+
+        for _, process in workers.values():
+            process.join()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Total number of shards, defaults to the number Discord recommends",
+    )
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from string import Formatter
+from typing import Any, Callable, Dict, Optional, Type, Union
+
+from discord import AllowedMentions, Interaction
+
+Template = Union[str, Callable[[Any], str]]
+
+
+class ErrorResponse:
+    """The message sent in response to an error.
+
+    ``template`` is either a format string, which is given the error as
+    ``error``, or a function taking the error and returning the message.
+    Nothing is mentioned unless ``allowed_mentions`` says otherwise."""
+
+    __slots__ = ("render", "ephemeral", "allowed_mentions")
+
+    def __init__(
+        self,
+        template: Template,
+        *,
+        ephemeral: bool = True,
+        allowed_mentions: Optional[AllowedMentions] = None,
+    ):
+        if callable(template):
+            self.render = template
+        elif any(field is not None for _, field, _, _ in Formatter().parse(template)):
+            self.render = lambda error: template.format(error=error)
+        else:
+            self.render = lambda _: template
+
+        self.ephemeral = ephemeral
+        self.allowed_mentions = allowed_mentions or AllowedMentions.none()
+
+    async def send(self, interaction: Interaction, error: BaseException) -> None:
+        content = self.render(error)
+
+        if interaction.response.is_done():
+            await interaction.followup.send(
+                content,
+                ephemeral=self.ephemeral,
+                allowed_mentions=self.allowed_mentions,
+            )
+        else:
+            await interaction.response.send_message(
+                content,
+                ephemeral=self.ephemeral,
+                allowed_mentions=self.allowed_mentions,
+            )
+
+
+class ErrorRegistry:
+    """Maps exception types to the responses sent when they are raised.
+
+    An error is handled by the response registered for the closest class in
+    its MRO. The lookup is cached per class and the cache is cleared whenever
+    a response is registered or unregistered."""
+
+    def __init__(self):
+        self._responses: Dict[Type[BaseException], ErrorResponse] = {}
+        self._resolved: Dict[Type[BaseException], Optional[ErrorResponse]] = {}
+
+    def register(
+        self,
+        error: Type[BaseException],
+        template: Template,
+        **kwargs: Any,
+    ) -> None:
+        """Registers the response to an exception type, see ErrorResponse"""
+        self._responses[error] = ErrorResponse(template, **kwargs)
+        self._resolved.clear()
+
+    def unregister(self, error: Type[BaseException]) -> None:
+        """Removes the response to an exception type, if there is one"""
+        self._responses.pop(error, None)
+        self._resolved.clear()
+
+    def resolve(self, error: Type[BaseException]) -> Optional[ErrorResponse]:
+        """Gets the response to an exception type"""
+        try:
+            return self._resolved[error]
+        except KeyError:
+            pass
+
+        response = next(
+            (self._responses[cls] for cls in error.__mro__ if cls in self._responses),
+            None,
+        )
+        self._resolved[error] = response
+        return response
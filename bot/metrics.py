@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import inspect
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+log = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Holds the database time spent by the interaction currently being handled.
+# Each interaction runs in its own task, so each gets its own value.
+db_time: ContextVar[Optional[List[float]]] = ContextVar("db_time", default=None)
+
+
+class Histogram:
+    """A histogram of durations in seconds with fixed bucket boundaries, in
+    the shape Prometheus expects"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in"""
+        target = q * self.count
+        seen = 0
+
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+
+            if seen >= target:
+                return bound
+
+        return float("inf")
+
+
+class Metrics:
+    """Per-command timings and error counts for application commands"""
+
+    def __init__(self):
+        self.duration: Dict[str, Histogram] = defaultdict(Histogram)
+        self.first_response: Dict[str, Histogram] = defaultdict(Histogram)
+        self.db: Dict[str, Histogram] = defaultdict(Histogram)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def record(
+        self,
+        command: str,
+        duration: float,
+        first_response: Optional[float],
+        db: float,
+    ) -> None:
+        self.duration[command].observe(duration)
+        self.db[command].observe(db)
+
+        if first_response is not None:
+            self.first_response[command].observe(first_response)
+
+    def record_error(self, command: str, error: BaseException) -> None:
+        self.errors[(command, type(error).__name__)] += 1
+
+    def render(self, gauges: Dict[str, Dict[str, float]]) -> str:
+        """Renders every metric in the Prometheus text exposition format.
+
+        ``gauges`` maps a metric name to values keyed on a ``kind`` label,
+        for values owned by other parts of the bot such as cache counters."""
+        lines: List[str] = []
+
+        for name, help_, histograms in (
+            (
+                "command_duration_seconds",
+                "Time taken to run a command",
+                self.duration,
+            ),
+            (
+                "command_first_response_seconds",
+                "Time taken to first respond to or defer an interaction",
+                self.first_response,
+            ),
+            (
+                "command_db_seconds",
+                "Time spent in the database while running a command",
+                self.db,
+            ),
+        ):
+            lines.append(f"# HELP glowguard_{name} {help_}")
+            lines.append(f"# TYPE glowguard_{name} histogram")
+
+            for command, histogram in histograms.items():
+                cumulative = 0
+
+                for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f'glowguard_{name}_bucket{{command="{command}",le="{le}"}} '
+                        f"{cumulative}"
+                    )
+
+                lines.append(
+                    f'glowguard_{name}_sum{{command="{command}"}} {histogram.sum}'
+                )
+                lines.append(
+                    f'glowguard_{name}_count{{command="{command}"}} {histogram.count}'
+                )
+
+        lines.append("# HELP glowguard_command_errors_total Errors raised by commands")
+        lines.append("# TYPE glowguard_command_errors_total counter")
+
+        for (command, error), count in self.errors.items():
+            lines.append(
+                f'glowguard_command_errors_total{{command="{command}",error="{error}"}}'
+                f" {count}"
+            )
+
+        for name, values in gauges.items():
+            lines.append(f"# TYPE glowguard_{name} gauge")
+
+            for kind, value in values.items():
+                lines.append(f'glowguard_{name}{{kind="{kind}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+class TimedRepository:
+    """Wraps a storage repository, adding the time spent in each call to the
+    current interaction's database time"""
+
+    def __init__(self, repository: Any):
+        self._repository = repository
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._repository, name)
+
+        if inspect.iscoroutinefunction(attribute):
+
+            @wraps(attribute)
+            async def timed(*args, **kwargs):
+                start = perf_counter()
+
+                try:
+                    return await attribute(*args, **kwargs)
+                finally:
+                    _add_db_time(perf_counter() - start)
+
+            return timed
+        elif inspect.isasyncgenfunction(attribute):
+
+            @wraps(attribute)
+            async def timed_iterator(*args, **kwargs):
+                iterator = attribute(*args, **kwargs)
+
+                while True:
+                    start = perf_counter()
+
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        _add_db_time(perf_counter() - start)
+
+                    yield item
+
+            return timed_iterator
+
+        return attribute
+
+
+def _add_db_time(elapsed: float) -> None:
+    holder = db_time.get()
+
+    if holder is not None:
+        holder[0] += elapsed
+
+
+class MetricsServer:
+    """Serves the bot's metrics over HTTP for Prometheus to scrape"""
+
+    def __init__(self, bot: Bot, host: str = "127.0.0.1", port: int = 9100):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, _: web.Request) -> web.Response:
+        return web.Response(
+            text=self.bot.tree.metrics.render(self.bot.gauges()),
+            content_type="text/plain",
+            charset="utf-8",
+        )
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from discord import Forbidden, HTTPException
+from discord.abc import Messageable
+
+log = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """A bounded queue of direct messages delivered by background workers.
+
+    Commands enqueue a message and respond straight away rather than waiting
+    on the DM endpoint. Messages that fail with a server error or a rate
+    limit are retried with exponential backoff, and messages enqueued while
+    the queue is full are dropped and counted."""
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 1000,
+        workers: int = 4,
+        retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+        self._queue: Optional[asyncio.Queue[Tuple[Messageable, str]]] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Starts the worker tasks"""
+        # Created here rather than in __init__ so the queue belongs to the
+        # running event loop.
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"notifications-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, *, timeout: Optional[float] = 10.0) -> None:
+        """Waits up to ``timeout`` seconds for queued messages to be delivered,
+        then stops the workers"""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                log.warning("Dropping %s undelivered notifications", self.pending)
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def enqueue(self, destination: Messageable, content: str) -> bool:
+        """Queues a message, returning False if it was dropped because the
+        queue is full or not running"""
+        if self._queue is None:
+            self.dropped += 1
+            return False
+
+        try:
+            self._queue.put_nowait((destination, content))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        return True
+
+    async def _deliver(self, destination: Messageable, content: str) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                await destination.send(content)
+            except Forbidden:
+                # The user has DMs closed or has blocked the bot, which
+                # retrying won't change.
+                self.failed += 1
+                return
+            except HTTPException as error:
+                if error.status < 500 and error.status != 429:
+                    self.failed += 1
+                    return
+
+                if attempt == self.retries:
+                    self.failed += 1
+                    log.warning("Giving up on notification after %s", error)
+                    return
+
+                self.retried += 1
+                await asyncio.sleep(self.backoff * 2**attempt)
+            else:
+                self.sent += 1
+                return
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+
+        while True:
+            destination, content = await self._queue.get()
+
+            try:
+                await self._deliver(destination, content)
+            except Exception:
+                self.failed += 1
+                log.exception("Failed to deliver notification")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the queue counters"""
+        return {
+            "pending": self.pending,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from bson import ObjectId
+
+from .storage import Job, JobRepository
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[Job], Awaitable[None]]
+
+# How long a job is leased to the process running it. Handlers make a
+# request or two, so one still running by then has died with its process.
+LEASE = timedelta(minutes=5)
+
+# Failed jobs are retried after RETRY_DELAY seconds, doubling with every
+# attempt up to MAX_RETRY_DELAY, and dropped after MAX_ATTEMPTS.
+RETRY_DELAY = 30.0
+MAX_RETRY_DELAY = 3600.0
+MAX_ATTEMPTS = 10
+
+
+class Scheduler:
+    """Runs jobs stored in the database once they are due.
+
+    Only the jobs due within ``horizon`` seconds are held in memory, in a
+    min-heap ordered on when they are due. A single task sleeps until the
+    soonest of them, and the window is reloaded from the database's due
+    index as it runs out, so pending jobs far in the future cost nothing.
+
+    Only jobs of a kind with a registered handler are loaded, and only those
+    for guilds this process owns are kept, paging past the rest. Before a
+    job runs it is leased by moving it to when the lease ends, so when
+    several processes load the same job only the first to lease it runs it,
+    and it runs again if that process dies. It is removed once it has run,
+    and retried with exponential backoff if it fails."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        jobs: JobRepository,
+        *,
+        horizon: float = 3600.0,
+        batch_size: int = 1000,
+    ):
+        self.bot = bot
+        self.jobs = jobs
+        self.horizon = timedelta(seconds=horizon)
+        self.batch_size = batch_size
+        self.handlers: Dict[str, Handler] = {}
+
+        self._heap: List[Tuple[datetime, str, Job]] = []
+        self._loaded_until = datetime.min.replace(tzinfo=timezone.utc)
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._truncated = False
+        self._running: Dict[str, asyncio.Task[None]] = {}
+
+    def register(self, kind: str, handler: Handler) -> None:
+        """Registers the function that runs jobs of a kind"""
+        self.handlers[kind] = handler
+        self._reload()
+
+    def unregister(self, kind: str) -> None:
+        self.handlers.pop(kind, None)
+        self._reload()
+
+    def _reload(self) -> None:
+        # Jobs of a newly handled kind may be due within the loaded window.
+        self._loaded_until = datetime.min.replace(tzinfo=timezone.utc)
+        self._truncated = False
+
+        if self._wake:
+            self._wake.set()
+
+    def start(self) -> None:
+        # Created here rather than in __init__ so it belongs to the running
+        # event loop on Python 3.8 and 3.9.
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def schedule(
+        self,
+        kind: str,
+        guild_id: int,
+        user_id: int,
+        due: datetime,
+        **data,
+    ) -> Job:
+        """Stores a job to run at ``due``"""
+        job = await self.jobs.add(
+            Job(guild=guild_id, user=user_id, kind=kind, due=due, data=data)
+        )
+
+        # Jobs beyond the loaded window are picked up when it moves on.
+        if self._wake and due < self._loaded_until and kind in self.handlers:
+            heapq.heappush(self._heap, (due, str(job["_id"]), job))
+            self._wake.set()
+
+        return job
+
+    async def cancel(self, kind: str, guild_id: int, user_id: int) -> int:
+        """Cancels a user's pending jobs of a kind"""
+        cancelled = await self.jobs.cancel(guild_id, user_id, kind)
+        self._heap = [
+            entry
+            for entry in self._heap
+            if not (
+                entry[2]["kind"] == kind
+                and entry[2]["guild"] == guild_id
+                and entry[2]["user"] == user_id
+            )
+        ]
+        heapq.heapify(self._heap)
+        return cancelled
+
+    async def _load(self, now: datetime) -> None:
+        until = now + self.horizon
+        kinds = list(self.handlers)
+        heap: List[Tuple[datetime, str, Job]] = []
+        after: Optional[Tuple[datetime, ObjectId]] = None
+        self._truncated = False
+
+        # Pages past the jobs of guilds other processes own, so a process
+        # never reloads the same page of someone else's jobs in a loop.
+        while kinds:
+            jobs = await self.jobs.due_before(
+                until, kinds=kinds, after=after, limit=self.batch_size
+            )
+            heap.extend(
+                (job["due"], str(job["_id"]), job)
+                for job in jobs
+                if self.bot.owns_guild(job["guild"])
+                and str(job["_id"]) not in self._running
+            )
+
+            if len(jobs) < self.batch_size:
+                break
+
+            after = (jobs[-1]["due"], jobs[-1]["_id"])
+
+            # If the window holds more of this process's jobs than a batch,
+            # it ends at the last job read and is reloaded once every loaded
+            # job has been started.
+            if len(heap) >= self.batch_size:
+                self._truncated = True
+                until = jobs[-1]["due"]
+                break
+
+        heapq.heapify(heap)
+        self._heap = heap
+        self._loaded_until = until
+
+    def _needs_load(self, now: datetime) -> bool:
+        if self._truncated:
+            return not self._heap
+
+        return now + self.horizon / 2 >= self._loaded_until
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.now(timezone.utc)
+
+            try:
+                if self._needs_load(now):
+                    await self._load(now)
+            except Exception:
+                log.exception("Failed to load scheduled jobs")
+                await asyncio.sleep(60)
+                continue
+
+            while self._heap and self._heap[0][0] <= now:
+                _, job_id, job = heapq.heappop(self._heap)
+                task = asyncio.create_task(self._execute(job))
+                self._running[job_id] = task
+                task.add_done_callback(
+                    lambda _, job_id=job_id: self._running.pop(job_id, None)
+                )
+
+            if self._truncated:
+                # Never empty here, as a truncated window holds a full batch
+                # of this process's jobs, and is reloaded once they have run.
+                wake_at = self._heap[0][0] if self._heap else now
+            else:
+                wake_at = self._loaded_until - self.horizon / 2
+
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+
+            self._wake.clear()  # type: ignore
+
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(),  # type: ignore
+                    max((wake_at - now).total_seconds(), 0),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: Job) -> None:
+        handler = self.handlers.get(job["kind"])
+
+        # Unregistered since it was loaded. Left in the database and not
+        # loaded again until an extension handles its kind again.
+        if handler is None:
+            return
+
+        now = datetime.now(timezone.utc)
+
+        try:
+            if not await self.jobs.claim(job["_id"], now, now + LEASE):
+                return
+
+            try:
+                await handler(job)
+            except Exception:
+                await self._retry(job)
+            else:
+                await self.jobs.complete(job["_id"])
+        except Exception:
+            # Left leased, so it runs again once the lease is over.
+            log.exception("Failed to update %s job %s", job["kind"], job["_id"])
+
+    async def _retry(self, job: Job) -> None:
+        attempts = job.get("attempts", 0) + 1
+
+        if attempts >= MAX_ATTEMPTS:
+            log.exception(
+                "Giving up on %s job %s after %s attempts",
+                job["kind"],
+                job["_id"],
+                attempts,
+            )
+            await self.jobs.complete(job["_id"])
+            return
+
+        delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+        due = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        log.exception(
+            "Failed to run %s job %s, retrying in %.0f seconds",
+            job["kind"],
+            job["_id"],
+            delay,
+        )
+        await self.jobs.retry(job["_id"], due)
+
+        if self._wake and due < self._loaded_until:
+            job = Job(**{**job, "due": due, "attempts": attempts})
+            heapq.heappush(self._heap, (due, str(job["_id"]), job))
+            self._wake.set()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """Records how long each phase of starting the bot takes.
+
+    Phases are timed from when the profiler is created and may overlap, as
+    extensions are loaded concurrently. Milestones, such as the gateway
+    connection opening, are phases that end when they are marked and start
+    when the previous milestone or phase ended."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self.last = self.started
+        self.finished = False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def mark(self, name: str, *, once: bool = False) -> None:
+        """Records a milestone, skipping it if ``once`` is set and it has
+        already been recorded"""
+        if once and any(phase["phase"] == name for phase in self.phases):
+            return
+
+        self.record(name, self.last)
+
+    def record(self, name: str, start: float) -> None:
+        end = perf_counter()
+        self.last = max(self.last, end)
+        self.phases.append(
+            {
+                "phase": name,
+                "start": round(start - self.started, 4),
+                "duration": round(end - start, 4),
+            }
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "total": round(self.last - self.started, 4),
+            "phases": self.phases,
+        }
+
+    def finish(self, path: Optional[str]) -> None:
+        """Logs the report, comparing it to the one from the last startup,
+        and appends it to the JSON lines file at ``path``"""
+        if self.finished:
+            return
+
+        self.finished = True
+        report = self.report()
+        previous = load_last_report(path) if path else None
+        log.info("Startup report: %s", json.dumps(report))
+        log.info("Startup timeline:\n%s", format_report(report, previous))
+
+        if path:
+            with open(path, "a") as f:
+                f.write(json.dumps(report) + "\n")
+
+
+def load_last_report(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    return json.loads(lines[-1]) if lines else None
+
+
+def format_report(report: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> str:
+    def with_total(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+        total = {"phase": "total", "start": 0.0, "duration": report["total"]}
+        return [*report["phases"], total]
+
+    rows = with_total(report)
+    before = (
+        {phase["phase"]: phase["duration"] for phase in with_total(previous)}
+        if previous
+        else {}
+    )
+    lines = [f"{'phase':<40} {'start s':>9} {'took s':>9} {'change':>9}"]
+
+    for phase in rows:
+        change = ""
+
+        if phase["phase"] in before:
+            change = f"{phase['duration'] - before[phase['phase']]:+.3f}"
+
+        lines.append(
+            f"{phase['phase']:<40} {phase['start']:>9.3f} "
+            f"{phase['duration']:>9.3f} {change:>9}"
+        )
+
+    return "\n".join(lines)
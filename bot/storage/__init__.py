@@ -0,0 +1,45 @@
+from typing import Any, Dict
+
+from .base import (
+    Job,
+    JobRepository,
+    Storage,
+    Tag,
+    TagRepository,
+    Warn,
+    WarnRepository,
+    WarnStats,
+)
+
+
+def create_storage(config: Dict[str, Any]) -> Storage:
+    """Creates the storage backend selected by the ``storage`` config key.
+
+    ``"mongo"`` (the default) connects to ``mongo_url``, and ``"sqlite"``
+    uses a SQLite database at ``sqlite_path``, in memory if unset. Backends
+    are imported lazily so the SQLite one works without Motor installed."""
+    backend = config.get("storage", "mongo")
+
+    if backend == "mongo":
+        from .mongo import MongoStorage
+
+        return MongoStorage(config["mongo_url"])
+    elif backend == "sqlite":
+        from .sqlite import SQLiteStorage
+
+        return SQLiteStorage(config.get("sqlite_path", ":memory:"))
+
+    raise ValueError(f"Unknown storage backend {backend!r}")
+
+
+__all__ = (
+    "Job",
+    "JobRepository",
+    "Storage",
+    "Tag",
+    "TagRepository",
+    "Warn",
+    "WarnRepository",
+    "WarnStats",
+    "create_storage",
+)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+)
+
+from bson import ObjectId
+
+
+class Tag(TypedDict):
+    guild: int
+    name: str
+    _name: str
+    content: str
+    author: int
+
+
+class Warn(TypedDict, total=False):
+    _id: ObjectId
+    guild: int
+    user: int
+    reason: str
+    moderator: int
+    warn_id: str
+    expires: Optional[datetime]
+
+
+class WarnStats(TypedDict):
+    total: int
+    recent: int
+    moderators: int
+    first: datetime
+    last: datetime
+
+
+class Job(TypedDict, total=False):
+    _id: ObjectId
+    guild: int
+    user: int
+    kind: str
+    due: datetime
+    data: Dict[str, Any]
+    attempts: int
+
+
+class TagRepository(ABC):
+    """Stores tags, keyed on the guild and the lowercase tag name.
+
+    Tag content is stored as a shared, reference counted body (see
+    ``bot.storage.bodies``), so tags with the same content in any number of
+    guilds are stored once. Tags are still given and returned with their
+    content inline."""
+
+    @abstractmethod
+    async def get(self, guild_id: int, name: str) -> Optional[Tag]:
+        """Gets a tag by name"""
+
+    @abstractmethod
+    async def create(self, tag: Tag) -> bool:
+        """Creates a tag, returning False if the guild already has a tag with
+        that name"""
+
+    @abstractmethod
+    async def update_content(self, guild_id: int, name: str, content: str) -> bool:
+        """Replaces a tag's content, returning False if it does not exist"""
+
+    @abstractmethod
+    async def delete(self, guild_id: int, name: str) -> bool:
+        """Deletes a tag, returning False if it does not exist"""
+
+    @abstractmethod
+    async def add_uses(self, counts: Mapping[Tuple[int, str], int]) -> None:
+        """Adds to the use counters of tags, keyed on the guild and the
+        lowercase tag name, in one batch"""
+
+    @abstractmethod
+    async def top(self, guild_id: int, *, limit: int) -> List[Tuple[str, int]]:
+        """Gets the display names and use counts of a guild's most used
+        tags, most used first, leaving out tags that were never used"""
+
+    @abstractmethod
+    async def starting_with(
+        self, guild_id: int, prefix: str, *, limit: int
+    ) -> List[str]:
+        """Gets up to ``limit`` display names of a guild's tags whose
+        lowercase name starts with ``prefix``, in order"""
+
+    @abstractmethod
+    def names(self) -> AsyncIterator[Tuple[int, str]]:
+        """Yields the guild and display name of every tag"""
+
+    @abstractmethod
+    async def backfill_guild(self, guild_id: int, *, batch_size: int = 1000) -> int:
+        """Assigns tags stored without a guild to the given guild, returning
+        how many were updated"""
+
+
+class WarnRepository(ABC):
+    """Stores warns, ordered within each guild and user by ``_id``.
+
+    ``_id`` is an ObjectId, so it also records when the warn was created.
+    Warns with an ``expires`` time are left out of every query once it has
+    passed, and are removed for good by ``prune_expired``."""
+
+    @abstractmethod
+    async def add(self, warn: Warn) -> Warn:
+        """Adds a warn, returning it with its ``_id`` set"""
+
+    @abstractmethod
+    async def add_many(self, warns: List[Warn]) -> None:
+        """Adds many warns in one operation"""
+
+    @abstractmethod
+    async def remove(self, guild_id: int, user_id: int, warn_id: str) -> bool:
+        """Removes a warn, returning False if it does not exist"""
+
+    @abstractmethod
+    async def clear(self, guild_id: int, user_id: int) -> int:
+        """Removes every warn for a user, returning how many were removed"""
+
+    @abstractmethod
+    async def page(
+        self,
+        guild_id: int,
+        user_id: int,
+        *,
+        after: Optional[ObjectId] = None,
+        limit: int,
+    ) -> List[Warn]:
+        """Gets up to ``limit`` warns for a user with an ``_id`` greater than
+        ``after``"""
+
+    @abstractmethod
+    def iterate(self, guild_id: int, user_id: int) -> AsyncIterator[Warn]:
+        """Yields every warn for a user without loading them all at once"""
+
+    @abstractmethod
+    async def count_since(
+        self,
+        guild_id: int,
+        user_id: int,
+        since: datetime,
+        *,
+        limit: Optional[int] = None,
+    ) -> int:
+        """Counts a user's warns created at or after ``since``, stopping at
+        ``limit`` if given"""
+
+    @abstractmethod
+    async def stats(
+        self,
+        guild_id: int,
+        user_id: int,
+        since: datetime,
+    ) -> Optional[WarnStats]:
+        """Summarises a user's warns, counting those created at or after
+        ``since`` as recent. Returns None if the user has no warns"""
+
+    @abstractmethod
+    async def prune_expired(self, now: datetime, *, batch_size: int = 1000) -> int:
+        """Removes warns that expired before ``now`` in batches of
+        ``batch_size``, returning how many were removed"""
+
+    @abstractmethod
+    async def backfill_guild(self, guild_id: int, *, batch_size: int = 1000) -> int:
+        """Assigns warns stored without a guild to the given guild, returning
+        how many were updated"""
+
+
+class JobRepository(ABC):
+    """Stores jobs for the scheduler, ordered by when they are due.
+
+    ``due`` is always a timezone aware datetime in UTC."""
+
+    @abstractmethod
+    async def add(self, job: Job) -> Job:
+        """Adds a job, returning it with its ``_id`` set"""
+
+    @abstractmethod
+    async def due_before(
+        self,
+        until: datetime,
+        *,
+        kinds: Sequence[str],
+        after: Optional[Tuple[datetime, ObjectId]] = None,
+        limit: int,
+    ) -> List[Job]:
+        """Gets up to ``limit`` jobs of the given kinds due before ``until``,
+        ordered by ``due`` then ``_id``, starting after the ``(due, _id)``
+        of the last job of the previous page if given"""
+
+    @abstractmethod
+    async def claim(
+        self, job_id: ObjectId, now: datetime, lease_until: datetime
+    ) -> bool:
+        """Leases a due job to the caller by moving it to ``lease_until``,
+        returning False if it isn't due, e.g. because another process leased
+        it first. A job is due again once its lease runs out, so it isn't
+        lost if the process running it dies"""
+
+    @abstractmethod
+    async def complete(self, job_id: ObjectId) -> None:
+        """Removes a job that has run"""
+
+    @abstractmethod
+    async def retry(self, job_id: ObjectId, due: datetime) -> None:
+        """Moves a job that failed to run to ``due``, counting the attempt"""
+
+    @abstractmethod
+    async def cancel(self, guild_id: int, user_id: int, kind: str) -> int:
+        """Removes a user's jobs of a kind, returning how many were removed"""
+
+
+class Storage(ABC):
+    """A storage backend, holding one repository per kind of document"""
+
+    tags: TagRepository
+    warns: WarnRepository
+    jobs: JobRepository
+
+    @abstractmethod
+    async def setup(self) -> None:
+        """Prepares the backend, e.g. by creating indexes or tables"""
+
+    async def close(self) -> None:
+        """Releases any resources held by the backend"""
@@ -0,0 +1,42 @@
+"""Tag bodies, stored once per distinct content and shared between tags.
+
+A body is keyed on the SHA-256 of its content, so identical tags in any
+number of guilds share one stored copy, and counts the tags referencing it
+so it can be removed once the last of them is deleted or edited. Bodies
+above ``COMPRESS_THRESHOLD`` bytes are compressed with zlib when that makes
+them smaller. Tags in MongoDB from before bodies were shared have no body
+and keep their content inline until they are next edited."""
+
+from __future__ import annotations
+
+import hashlib
+import zlib
+from typing import NamedTuple
+
+# Below this, zlib's header and the lack of repetition in short text mean
+# compressing rarely saves anything.
+COMPRESS_THRESHOLD = 256
+COMPRESS_LEVEL = 6
+
+
+class Body(NamedTuple):
+    hash: str
+    data: bytes
+    compressed: bool
+
+
+def encode_body(content: str) -> Body:
+    raw = content.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+
+    if len(raw) > COMPRESS_THRESHOLD:
+        compressed = zlib.compress(raw, COMPRESS_LEVEL)
+
+        if len(compressed) < len(raw):
+            return Body(digest, compressed, True)
+
+    return Body(digest, raw, False)
+
+
+def decode_body(data: bytes, compressed: bool) -> str:
+    return (zlib.decompress(data) if compressed else data).decode("utf-8")
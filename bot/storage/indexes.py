@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "tags": [
+        IndexModel(
+            [("guild", ASCENDING), ("_name", ASCENDING)],
+            name="guild_name",
+            unique=True,
+        ),
+        # Only tags that have been used, so /tags top reads the first few
+        # entries of the guild's range and nothing else.
+        IndexModel(
+            [("guild", ASCENDING), ("uses", DESCENDING)],
+            name="guild_uses",
+            partialFilterExpression={"uses": {"$gt": 0}},
+        ),
+    ],
+    "warns": [
+        IndexModel(
+            [("guild", ASCENDING), ("user", ASCENDING), ("warn_id", ASCENDING)],
+            name="guild_user_warn_id",
+        ),
+        IndexModel(
+            [("guild", ASCENDING), ("user", ASCENDING), ("_id", ASCENDING)],
+            name="guild_user_id",
+        ),
+        # MongoDB removes warns about a minute after they expire. Warns
+        # without an expiry time are never removed.
+        IndexModel([("expires", ASCENDING)], name="expires", expireAfterSeconds=0),
+    ],
+    "jobs": [
+        IndexModel([("due", ASCENDING), ("_id", ASCENDING)], name="due_id"),
+        IndexModel(
+            [("guild", ASCENDING), ("user", ASCENDING), ("kind", ASCENDING)],
+            name="guild_user_kind",
+        ),
+    ],
+}
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase) -> None:
+    """Creates the indexes every collection the bot uses relies on.
+
+    Index creation is idempotent, so this is safe to run on every start."""
+    for collection, indexes in INDEXES.items():
+        await database[collection].create_indexes(indexes)
@@ -0,0 +1,472 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Mapping, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from .base import (
+    Job,
+    JobRepository,
+    Storage,
+    Tag,
+    TagRepository,
+    Warn,
+    WarnRepository,
+    WarnStats,
+)
+from .bodies import decode_body, encode_body
+from .indexes import ensure_indexes
+
+WARN_PROJECTION = {"_id": 1, "warn_id": 1, "reason": 1, "moderator": 1, "expires": 1}
+
+
+def active(now: datetime) -> dict:
+    """Matches warns that haven't expired.
+
+    Expired warns are removed by the TTL index, so this only ever filters
+    out the few the TTL monitor hasn't got to yet."""
+    return {"expires": {"$not": {"$lte": now}}}
+
+
+def _utc(value: datetime) -> datetime:
+    # Motor returns naive datetimes unless the client is timezone aware.
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _warn(document: dict) -> Warn:
+    if document.get("expires"):
+        document["expires"] = _utc(document["expires"])
+
+    return Warn(**document)
+
+
+async def backfill_guild(
+    collection: AsyncIOMotorCollection,
+    guild_id: int,
+    *,
+    batch_size: int = 1000,
+) -> int:
+    """Assigns every document without a guild to the given guild.
+
+    Documents are updated in batches of ``batch_size`` so a large backfill
+    never holds a long-running write over the whole collection. Returns the
+    number of documents updated."""
+    updated = 0
+
+    while True:
+        ids = [
+            document["_id"]
+            async for document in collection.find(
+                {"guild": {"$exists": False}},
+                {"_id": 1},
+                limit=batch_size,
+            )
+        ]
+
+        if not ids:
+            return updated
+
+        result = await collection.update_many(
+            {"_id": {"$in": ids}, "guild": {"$exists": False}},
+            {"$set": {"guild": guild_id}},
+        )
+        updated += result.modified_count
+
+
+class MongoTagRepository(TagRepository):
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        bodies: AsyncIOMotorCollection,
+    ):
+        self.collection = collection
+        self.bodies = bodies
+
+    async def get(self, guild_id: int, name: str) -> Optional[Tag]:
+        # Joined on the body's _id, so the body costs no extra round trip.
+        tags = await self.collection.aggregate(
+            [
+                {"$match": {"guild": guild_id, "_name": name.lower()}},
+                {"$limit": 1},
+                {
+                    "$lookup": {
+                        "from": self.bodies.name,
+                        "localField": "body",
+                        "foreignField": "_id",
+                        "as": "bodies",
+                    }
+                },
+                {"$project": {"_id": 0, "body": 0}},
+            ]
+        ).to_list(1)
+
+        if not tags:
+            return None
+
+        tag = tags[0]
+        bodies = tag.pop("bodies")
+
+        if bodies:
+            tag["content"] = decode_body(bodies[0]["data"], bodies[0]["compressed"])
+
+        return tag
+
+    async def acquire_body(self, content: str) -> str:
+        """Stores a body, or adds a reference to it if it is already
+        stored, returning its hash"""
+        body = encode_body(content)
+        await self.bodies.update_one(
+            {"_id": body.hash},
+            {
+                "$inc": {"refs": 1},
+                "$setOnInsert": {"data": body.data, "compressed": body.compressed},
+            },
+            upsert=True,
+        )
+        return body.hash
+
+    async def release_body(self, digest: Optional[str]) -> None:
+        """Removes a reference to a body, removing the body with the last"""
+        if digest is None:
+            return
+
+        body = await self.bodies.find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refs": -1}},
+            projection={"refs": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        # Rechecked in the delete, in case a new reference was added since.
+        if body and body["refs"] <= 0:
+            await self.bodies.delete_one({"_id": digest, "refs": {"$lte": 0}})
+
+    async def create(self, tag: Tag) -> bool:
+        digest = await self.acquire_body(tag["content"])
+        document = {key: value for key, value in tag.items() if key != "content"}
+
+        # Relies on the unique (guild, _name) index rather than checking
+        # first, so two concurrent creates can't both succeed.
+        try:
+            await self.collection.insert_one({**document, "body": digest})
+        except DuplicateKeyError:
+            await self.release_body(digest)
+            return False
+
+        return True
+
+    async def update_content(self, guild_id: int, name: str, content: str) -> bool:
+        # Acquired first, so a body shared with the old content is never
+        # released to zero references in between.
+        digest = await self.acquire_body(content)
+        old = await self.collection.find_one_and_update(
+            {"guild": guild_id, "_name": name.lower()},
+            {"$set": {"body": digest}, "$unset": {"content": ""}},
+            projection={"body": 1},
+        )
+
+        if old is None:
+            await self.release_body(digest)
+            return False
+
+        await self.release_body(old.get("body"))
+        return True
+
+    async def delete(self, guild_id: int, name: str) -> bool:
+        old = await self.collection.find_one_and_delete(
+            {"guild": guild_id, "_name": name.lower()},
+            projection={"body": 1},
+        )
+
+        if old is None:
+            return False
+
+        await self.release_body(old.get("body"))
+        return True
+
+    async def add_uses(self, counts: Mapping[Tuple[int, str], int]) -> None:
+        await self.collection.bulk_write(
+            [
+                UpdateOne({"guild": guild_id, "_name": name}, {"$inc": {"uses": uses}})
+                for (guild_id, name), uses in counts.items()
+            ],
+            # Lets the server apply the increments in any order, and carry
+            # on past one that fails.
+            ordered=False,
+        )
+
+    async def top(self, guild_id: int, *, limit: int) -> List[Tuple[str, int]]:
+        return [
+            (tag["name"], tag["uses"])
+            async for tag in self.collection.find(
+                {"guild": guild_id, "uses": {"$gt": 0}},
+                {"_id": 0, "name": 1, "uses": 1},
+                sort=[("uses", DESCENDING)],
+                limit=limit,
+            )
+        ]
+
+    async def starting_with(
+        self, guild_id: int, prefix: str, *, limit: int
+    ) -> List[str]:
+        prefix = prefix.lower()
+
+        # A range rather than a regex, so it reads only the matching part of
+        # the (guild, _name) index.
+        return [
+            tag["name"]
+            async for tag in self.collection.find(
+                {
+                    "guild": guild_id,
+                    "_name": {"$gte": prefix, "$lt": prefix + "\uffff"},
+                },
+                {"_id": 0, "name": 1},
+                sort=[("_name", ASCENDING)],
+                limit=limit,
+            )
+        ]
+
+    async def names(self) -> AsyncIterator[Tuple[int, str]]:
+        async for tag in self.collection.find(
+            {"guild": {"$exists": True}},
+            {"_id": 0, "guild": 1, "name": 1},
+        ):
+            yield tag["guild"], tag["name"]
+
+    async def backfill_guild(self, guild_id: int, *, batch_size: int = 1000) -> int:
+        return await backfill_guild(self.collection, guild_id, batch_size=batch_size)
+
+
+class MongoWarnRepository(WarnRepository):
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def add(self, warn: Warn) -> Warn:
+        warn = Warn(**warn)
+        await self.collection.insert_one(warn)
+        return warn
+
+    async def add_many(self, warns: List[Warn]) -> None:
+        await self.collection.insert_many([dict(warn) for warn in warns])
+
+    async def remove(self, guild_id: int, user_id: int, warn_id: str) -> bool:
+        result = await self.collection.delete_one(
+            {"guild": guild_id, "user": user_id, "warn_id": warn_id}
+        )
+        return result.deleted_count > 0
+
+    async def clear(self, guild_id: int, user_id: int) -> int:
+        result = await self.collection.delete_many({"guild": guild_id, "user": user_id})
+        return result.deleted_count
+
+    async def page(
+        self,
+        guild_id: int,
+        user_id: int,
+        *,
+        after: Optional[ObjectId] = None,
+        limit: int,
+    ) -> List[Warn]:
+        query: dict = {
+            "guild": guild_id,
+            "user": user_id,
+            **active(datetime.now(timezone.utc)),
+        }
+
+        if after is not None:
+            query["_id"] = {"$gt": after}
+
+        warns = await (
+            self.collection.find(query, WARN_PROJECTION)
+            .sort("_id", ASCENDING)
+            .limit(limit)
+            .to_list(None)
+        )
+        return [_warn(warn) for warn in warns]
+
+    async def iterate(self, guild_id: int, user_id: int) -> AsyncIterator[Warn]:
+        async for warn in self.collection.find(
+            {
+                "guild": guild_id,
+                "user": user_id,
+                **active(datetime.now(timezone.utc)),
+            },
+            WARN_PROJECTION,
+        ).sort("_id", ASCENDING):
+            yield _warn(warn)
+
+    async def count_since(
+        self,
+        guild_id: int,
+        user_id: int,
+        since: datetime,
+        *,
+        limit: Optional[int] = None,
+    ) -> int:
+        # ObjectIds embed their creation time, so a range on _id is a range
+        # on creation time that the (guild, user, _id) index answers directly.
+        return await self.collection.count_documents(
+            {
+                "guild": guild_id,
+                "user": user_id,
+                "_id": {"$gte": ObjectId.from_datetime(since)},
+                **active(datetime.now(timezone.utc)),
+            },
+            **({"limit": limit} if limit else {}),
+        )
+
+    async def stats(
+        self,
+        guild_id: int,
+        user_id: int,
+        since: datetime,
+    ) -> Optional[WarnStats]:
+        results = await self.collection.aggregate(
+            [
+                {
+                    "$match": {
+                        "guild": guild_id,
+                        "user": user_id,
+                        **active(datetime.now(timezone.utc)),
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "recent": {
+                            "$sum": {
+                                "$cond": [
+                                    {"$gte": ["$_id", ObjectId.from_datetime(since)]},
+                                    1,
+                                    0,
+                                ]
+                            }
+                        },
+                        "moderators": {"$addToSet": "$moderator"},
+                        "first": {"$min": "$_id"},
+                        "last": {"$max": "$_id"},
+                    }
+                },
+            ]
+        ).to_list(1)
+
+        if not results:
+            return None
+
+        return WarnStats(
+            total=results[0]["total"],
+            recent=results[0]["recent"],
+            moderators=len(results[0]["moderators"]),
+            first=results[0]["first"].generation_time,
+            last=results[0]["last"].generation_time,
+        )
+
+    async def prune_expired(self, now: datetime, *, batch_size: int = 1000) -> int:
+        # Normally left to the TTL index, this catches up on any backlog it
+        # has, e.g. after restoring a backup, without one huge delete.
+        removed = 0
+
+        while True:
+            ids = [
+                document["_id"]
+                async for document in self.collection.find(
+                    {"expires": {"$lte": now}},
+                    {"_id": 1},
+                    limit=batch_size,
+                )
+            ]
+
+            if not ids:
+                return removed
+
+            result = await self.collection.delete_many({"_id": {"$in": ids}})
+            removed += result.deleted_count
+
+    async def backfill_guild(self, guild_id: int, *, batch_size: int = 1000) -> int:
+        return await backfill_guild(self.collection, guild_id, batch_size=batch_size)
+
+
+class MongoJobRepository(JobRepository):
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+
+    async def add(self, job: Job) -> Job:
+        job = Job(**job)
+        await self.collection.insert_one(job)
+        return job
+
+    async def due_before(
+        self,
+        until: datetime,
+        *,
+        kinds: Sequence[str],
+        after: Optional[Tuple[datetime, ObjectId]] = None,
+        limit: int,
+    ) -> List[Job]:
+        query: dict = {"due": {"$lt": until}, "kind": {"$in": list(kinds)}}
+
+        if after is not None:
+            due, job_id = after
+            query["$or"] = [
+                {"due": {"$gt": due}},
+                {"due": due, "_id": {"$gt": job_id}},
+            ]
+
+        jobs = await self.collection.find(
+            query,
+            sort=[("due", ASCENDING), ("_id", ASCENDING)],
+            limit=limit,
+        ).to_list(None)
+
+        for job in jobs:
+            job["due"] = _utc(job["due"])
+
+        return jobs
+
+    async def claim(
+        self, job_id: ObjectId, now: datetime, lease_until: datetime
+    ) -> bool:
+        result = await self.collection.update_one(
+            {"_id": job_id, "due": {"$lte": now}},
+            {"$set": {"due": lease_until}},
+        )
+        return result.modified_count > 0
+
+    async def complete(self, job_id: ObjectId) -> None:
+        await self.collection.delete_one({"_id": job_id})
+
+    async def retry(self, job_id: ObjectId, due: datetime) -> None:
+        await self.collection.update_one(
+            {"_id": job_id}, {"$set": {"due": due}, "$inc": {"attempts": 1}}
+        )
+
+    async def cancel(self, guild_id: int, user_id: int, kind: str) -> int:
+        result = await self.collection.delete_many(
+            {"guild": guild_id, "user": user_id, "kind": kind}
+        )
+        return result.deleted_count
+
+
+class MongoStorage(Storage):
+    """Stores documents in MongoDB through Motor"""
+
+    def __init__(self, url: str, database: str = "bot"):
+        self.client = AsyncIOMotorClient(url)
+        self.database = self.client[database]
+
+        self.tags = MongoTagRepository(
+            self.database["tags"], self.database["tag_bodies"]
+        )
+        self.warns = MongoWarnRepository(self.database["warns"])
+        self.jobs = MongoJobRepository(self.database["jobs"])
+
+    async def setup(self) -> None:
+        await ensure_indexes(self.database)
+
+    async def close(self) -> None:
+        self.client.close()
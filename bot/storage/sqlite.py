@@ -0,0 +1,489 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Mapping, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+from .base import (
+    Job,
+    JobRepository,
+    Storage,
+    Tag,
+    TagRepository,
+    Warn,
+    WarnRepository,
+    WarnStats,
+)
+from .bodies import decode_body, encode_body
+
+# Warns are keyed on the hex form of an ObjectId, which sorts the same way as
+# the ObjectId itself, so ranges on it are ranges on creation time just like
+# ranges on _id in MongoDB.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tags (
+    guild INTEGER NOT NULL,
+    _name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    author INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild, _name)
+);
+
+-- Only tags that have been used, so /tags top never reads the rest.
+CREATE INDEX IF NOT EXISTS tags_guild_uses ON tags (guild, uses DESC)
+    WHERE uses > 0;
+
+CREATE TABLE IF NOT EXISTS tag_bodies (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS warns (
+    id TEXT PRIMARY KEY,
+    guild INTEGER NOT NULL,
+    user INTEGER NOT NULL,
+    warn_id TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    moderator INTEGER NOT NULL,
+    expires REAL
+);
+
+CREATE INDEX IF NOT EXISTS warns_guild_user_id ON warns (guild, user, id);
+CREATE INDEX IF NOT EXISTS warns_guild_user_warn_id ON warns (guild, user, warn_id);
+
+-- Only warns that expire, so the sweeper never reads the rest.
+CREATE INDEX IF NOT EXISTS warns_expires ON warns (expires)
+    WHERE expires IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    guild INTEGER NOT NULL,
+    user INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    due REAL NOT NULL,
+    data TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS jobs_due_id ON jobs (due, id);
+CREATE INDEX IF NOT EXISTS jobs_guild_user_kind ON jobs (guild, user, kind);
+"""
+
+ACTIVE = "(expires IS NULL OR expires > ?)"
+
+WARN_COLUMNS = "id, guild, user, warn_id, reason, moderator, expires"
+
+
+def _warn(row: sqlite3.Row) -> Warn:
+    return Warn(
+        _id=ObjectId(row["id"]),
+        guild=row["guild"],
+        user=row["user"],
+        warn_id=row["warn_id"],
+        reason=row["reason"],
+        moderator=row["moderator"],
+        expires=(
+            datetime.fromtimestamp(row["expires"], timezone.utc)
+            if row["expires"] is not None
+            else None
+        ),
+    )
+
+
+def _warn_row(warn: Warn) -> dict:
+    expires = warn.get("expires")
+
+    return {
+        **warn,
+        "id": str(warn.get("_id") or ObjectId()),
+        "expires": expires.timestamp() if expires else None,
+    }
+
+
+def _now() -> float:
+    return datetime.now(timezone.utc).timestamp()
+
+
+class SQLiteTagRepository(TagRepository):
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    async def get(self, guild_id: int, name: str) -> Optional[Tag]:
+        row = self.connection.execute(
+            "SELECT guild, name, _name, author, data, compressed"
+            " FROM tags JOIN tag_bodies ON hash = body"
+            " WHERE guild = ? AND _name = ?",
+            (guild_id, name.lower()),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return Tag(
+            guild=row["guild"],
+            name=row["name"],
+            _name=row["_name"],
+            content=decode_body(row["data"], row["compressed"]),
+            author=row["author"],
+        )
+
+    def _acquire_body(self, content: str) -> str:
+        body = encode_body(content)
+        self.connection.execute(
+            "INSERT INTO tag_bodies (hash, data, compressed, refs)"
+            " VALUES (?, ?, ?, 1)"
+            " ON CONFLICT (hash) DO UPDATE SET refs = refs + 1",
+            body,
+        )
+        return body.hash
+
+    def _release_body(self, digest: str) -> None:
+        self.connection.execute(
+            "UPDATE tag_bodies SET refs = refs - 1 WHERE hash = ?", (digest,)
+        )
+        self.connection.execute(
+            "DELETE FROM tag_bodies WHERE hash = ? AND refs <= 0", (digest,)
+        )
+
+    def _body(self, guild_id: int, name: str) -> Optional[sqlite3.Row]:
+        return self.connection.execute(
+            "SELECT body FROM tags WHERE guild = ? AND _name = ?",
+            (guild_id, name.lower()),
+        ).fetchone()
+
+    async def create(self, tag: Tag) -> bool:
+        # The body's reference is rolled back along with the insert.
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO tags (guild, _name, name, author, body)"
+                    " VALUES (:guild, :_name, :name, :author, :body)",
+                    {**tag, "body": self._acquire_body(tag["content"])},
+                )
+        except sqlite3.IntegrityError:
+            return False
+
+        return True
+
+    async def update_content(self, guild_id: int, name: str, content: str) -> bool:
+        with self.connection:
+            old = self._body(guild_id, name)
+
+            if old is None:
+                return False
+
+            self.connection.execute(
+                "UPDATE tags SET body = ? WHERE guild = ? AND _name = ?",
+                (self._acquire_body(content), guild_id, name.lower()),
+            )
+            self._release_body(old["body"])
+
+        return True
+
+    async def delete(self, guild_id: int, name: str) -> bool:
+        with self.connection:
+            old = self._body(guild_id, name)
+
+            if old is None:
+                return False
+
+            self.connection.execute(
+                "DELETE FROM tags WHERE guild = ? AND _name = ?",
+                (guild_id, name.lower()),
+            )
+            self._release_body(old["body"])
+
+        return True
+
+    async def add_uses(self, counts: Mapping[Tuple[int, str], int]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE tags SET uses = uses + ? WHERE guild = ? AND _name = ?",
+                [(uses, guild_id, name) for (guild_id, name), uses in counts.items()],
+            )
+
+    async def top(self, guild_id: int, *, limit: int) -> List[Tuple[str, int]]:
+        rows = self.connection.execute(
+            "SELECT name, uses FROM tags WHERE guild = ? AND uses > 0"
+            " ORDER BY uses DESC LIMIT ?",
+            (guild_id, limit),
+        )
+
+        return [(row["name"], row["uses"]) for row in rows]
+
+    async def starting_with(
+        self, guild_id: int, prefix: str, *, limit: int
+    ) -> List[str]:
+        prefix = prefix.lower()
+        rows = self.connection.execute(
+            "SELECT name FROM tags WHERE guild = ? AND _name >= ? AND _name < ?"
+            " ORDER BY _name LIMIT ?",
+            (guild_id, prefix, prefix + "\uffff", limit),
+        )
+
+        return [row["name"] for row in rows]
+
+    async def names(self) -> AsyncIterator[Tuple[int, str]]:
+        for row in self.connection.execute("SELECT guild, name FROM tags"):
+            yield row["guild"], row["name"]
+
+    async def backfill_guild(self, guild_id: int, *, batch_size: int = 1000) -> int:
+        # The schema has always required a guild, so there is nothing to do.
+        return 0
+
+
+class SQLiteWarnRepository(WarnRepository):
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    async def add(self, warn: Warn) -> Warn:
+        warn = Warn(**{**warn, "_id": ObjectId()})
+
+        with self.connection:
+            self.connection.execute(
+                f"INSERT INTO warns ({WARN_COLUMNS}) VALUES"
+                " (:id, :guild, :user, :warn_id, :reason, :moderator, :expires)",
+                _warn_row(warn),
+            )
+
+        return warn
+
+    async def add_many(self, warns: List[Warn]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO warns ({WARN_COLUMNS}) VALUES"
+                " (:id, :guild, :user, :warn_id, :reason, :moderator, :expires)",
+                [_warn_row(warn) for warn in warns],
+            )
+
+    async def remove(self, guild_id: int, user_id: int, warn_id: str) -> bool:
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM warns WHERE guild = ? AND user = ? AND warn_id = ?",
+                (guild_id, user_id, warn_id),
+            )
+
+        return cursor.rowcount > 0
+
+    async def clear(self, guild_id: int, user_id: int) -> int:
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM warns WHERE guild = ? AND user = ?",
+                (guild_id, user_id),
+            )
+
+        return cursor.rowcount
+
+    async def page(
+        self,
+        guild_id: int,
+        user_id: int,
+        *,
+        after: Optional[ObjectId] = None,
+        limit: int,
+    ) -> List[Warn]:
+        rows = self.connection.execute(
+            f"SELECT * FROM warns WHERE guild = ? AND user = ? AND id > ?"
+            f" AND {ACTIVE} ORDER BY id LIMIT ?",
+            (guild_id, user_id, str(after) if after else "", _now(), limit),
+        )
+
+        return [_warn(row) for row in rows]
+
+    async def iterate(self, guild_id: int, user_id: int) -> AsyncIterator[Warn]:
+        rows = self.connection.execute(
+            f"SELECT * FROM warns WHERE guild = ? AND user = ? AND {ACTIVE}"
+            " ORDER BY id",
+            (guild_id, user_id, _now()),
+        )
+
+        for row in rows:
+            yield _warn(row)
+
+    async def count_since(
+        self,
+        guild_id: int,
+        user_id: int,
+        since: datetime,
+        *,
+        limit: Optional[int] = None,
+    ) -> int:
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM warns"
+            f" WHERE guild = ? AND user = ? AND id >= ? AND {ACTIVE} LIMIT ?)",
+            (
+                guild_id,
+                user_id,
+                str(ObjectId.from_datetime(since)),
+                _now(),
+                limit or -1,
+            ),
+        ).fetchone()
+
+        return count
+
+    async def stats(
+        self,
+        guild_id: int,
+        user_id: int,
+        since: datetime,
+    ) -> Optional[WarnStats]:
+        row = self.connection.execute(
+            "SELECT COUNT(*) AS total, SUM(id >= ?) AS recent,"
+            " COUNT(DISTINCT moderator) AS moderators,"
+            " MIN(id) AS first, MAX(id) AS last"
+            f" FROM warns WHERE guild = ? AND user = ? AND {ACTIVE}",
+            (str(ObjectId.from_datetime(since)), guild_id, user_id, _now()),
+        ).fetchone()
+
+        if not row["total"]:
+            return None
+
+        return WarnStats(
+            total=row["total"],
+            recent=row["recent"],
+            moderators=row["moderators"],
+            first=ObjectId(row["first"]).generation_time,
+            last=ObjectId(row["last"]).generation_time,
+        )
+
+    async def prune_expired(self, now: datetime, *, batch_size: int = 1000) -> int:
+        removed = 0
+
+        # Batched so a large backlog doesn't hold the write lock, which other
+        # processes of a cluster share, for one long transaction.
+        while True:
+            with self.connection:
+                cursor = self.connection.execute(
+                    "DELETE FROM warns WHERE id IN (SELECT id FROM warns"
+                    " WHERE expires <= ? LIMIT ?)",
+                    (now.timestamp(), batch_size),
+                )
+
+            removed += cursor.rowcount
+
+            if cursor.rowcount < batch_size:
+                return removed
+
+            await asyncio.sleep(0)
+
+    async def backfill_guild(self, guild_id: int, *, batch_size: int = 1000) -> int:
+        return 0
+
+
+class SQLiteJobRepository(JobRepository):
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    async def add(self, job: Job) -> Job:
+        job = Job(**{**job, "_id": ObjectId()})
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO jobs (id, guild, user, kind, due, data)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    str(job["_id"]),
+                    job["guild"],
+                    job["user"],
+                    job["kind"],
+                    job["due"].timestamp(),
+                    json.dumps(job["data"]),
+                ),
+            )
+
+        return job
+
+    async def due_before(
+        self,
+        until: datetime,
+        *,
+        kinds: Sequence[str],
+        after: Optional[Tuple[datetime, ObjectId]] = None,
+        limit: int,
+    ) -> List[Job]:
+        due, job_id = (after[0].timestamp(), str(after[1])) if after else (0.0, "")
+        rows = self.connection.execute(
+            "SELECT * FROM jobs WHERE due < ? AND (due, id) > (?, ?)"
+            f" AND kind IN ({', '.join('?' * len(kinds))})"
+            " ORDER BY due, id LIMIT ?",
+            (until.timestamp(), due, job_id, *kinds, limit),
+        )
+
+        return [
+            Job(
+                _id=ObjectId(row["id"]),
+                guild=row["guild"],
+                user=row["user"],
+                kind=row["kind"],
+                due=datetime.fromtimestamp(row["due"], timezone.utc),
+                data=json.loads(row["data"]),
+                attempts=row["attempts"],
+            )
+            for row in rows
+        ]
+
+    async def claim(
+        self, job_id: ObjectId, now: datetime, lease_until: datetime
+    ) -> bool:
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET due = ? WHERE id = ? AND due <= ?",
+                (lease_until.timestamp(), str(job_id), now.timestamp()),
+            )
+
+        return cursor.rowcount > 0
+
+    async def complete(self, job_id: ObjectId) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM jobs WHERE id = ?", (str(job_id),))
+
+    async def retry(self, job_id: ObjectId, due: datetime) -> None:
+        with self.connection:
+            self.connection.execute(
+                "UPDATE jobs SET due = ?, attempts = attempts + 1 WHERE id = ?",
+                (due.timestamp(), str(job_id)),
+            )
+
+    async def cancel(self, guild_id: int, user_id: int, kind: str) -> int:
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM jobs WHERE guild = ? AND user = ? AND kind = ?",
+                (guild_id, user_id, kind),
+            )
+
+        return cursor.rowcount
+
+
+class SQLiteStorage(Storage):
+    """Stores documents in a SQLite database inside the bot's process.
+
+    Meant for small deployments and for benchmarking without a MongoDB
+    server. Queries run on the event loop, which is fine while they stay
+    in the sub-millisecond range SQLite manages for small databases."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+
+        self.tags = SQLiteTagRepository(self.connection)
+        self.warns = SQLiteWarnRepository(self.connection)
+        self.jobs = SQLiteJobRepository(self.connection)
+
+    async def setup(self) -> None:
+        if self.path != ":memory:":
+            # Lets processes serving other shards read while one writes.
+            self.connection.execute("PRAGMA journal_mode=WAL")
+
+        self.connection.executescript(SCHEMA)
+
+    async def close(self) -> None:
+        self.connection.close()
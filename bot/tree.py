@@ -1,10 +1,19 @@
 from __future__ import annotations
 
-from typing import List, Optional, TYPE_CHECKING
+import asyncio
+import json
+import logging
+import os
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from typing import Any, Dict, List, Optional, TYPE_CHECKING, Union
 
-from discord import AllowedMentions, Interaction
+from discord import Interaction, InteractionType
+from discord.abc import Snowflake
 from discord.app_commands import (
     AppCommand,
+    AppCommandGroup,
     AppCommandError,
     BotMissingPermissions,
     CommandNotFound,
@@ -15,28 +24,79 @@ from discord.app_commands import (
     NoPrivateMessage,
     CommandOnCooldown,
 )
+from discord.webhook.async_ import async_context
 
-from cogs.utils import (
-    TagExists,
-    TagNotFound,
-    MissingPermissionsForTagDeletion,
-    MissingPermissionsForTagEdit,
-    WarnNotFound,
-    MissingGuildUserData,
-    BotFailedHierarchy,
-    FailedHierarchy,
-    CannotPerformActionOnBot,
-    CannotPerformActionOnSelf,
-    CannotPerformActionOnOwner,
-    CannotPerformActionOnMe,
-    InvalidDuration,
-    DurationTooLong,
-    UserNotMuted,
-)
+from cogs.utils import NotOwner
+
+from .errors import ErrorRegistry, ErrorResponse
+from .metrics import Metrics, db_time
 
 if TYPE_CHECKING:
     from .bot import Bot
 
+log = logging.getLogger(__name__)
+
+
+def dump_command(command: AppCommand) -> Dict[str, Any]:
+    """Converts a command back into the payload it was created from"""
+    payload: Dict[str, Any] = dict(command.to_dict())
+    payload["nsfw"] = command.nsfw
+    payload["dm_permission"] = command.dm_permission
+    payload["default_member_permissions"] = (
+        str(command.default_member_permissions.value)
+        if command.default_member_permissions is not None
+        else None
+    )
+    return payload
+
+
+UNKNOWN_ERROR = ErrorResponse("An unknown error occurred while running this command.")
+
+
+def read_cache(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(path: str, cache: Dict[str, Any]) -> None:
+    """Writes the command cache through a temporary file of its own, so a
+    reader never sees it half written"""
+    with NamedTemporaryFile(
+        "w",
+        dir=os.path.dirname(path) or ".",
+        suffix=".tmp",
+        delete=False,
+    ) as f:
+        try:
+            json.dump(cache, f)
+            f.close()
+            os.replace(f.name, path)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+
+
+class ResponseTimer:
+    """Wraps the webhook adapter used by an interaction to note when it was
+    first responded to"""
+
+    def __init__(self, adapter: Any):
+        self.adapter = adapter
+        self.responded_at: Optional[float] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.adapter, name)
+
+    async def create_interaction_response(self, *args, **kwargs):
+        try:
+            return await self.adapter.create_interaction_response(*args, **kwargs)
+        finally:
+            if self.responded_at is None:
+                self.responded_at = perf_counter()
+
 
 class BetterCommandTree(CommandTree):
     """A subclass of CommandTree that adds a few extra methods to make
@@ -45,162 +105,210 @@ class BetterCommandTree(CommandTree):
     def __init__(self, client: "Bot"):
         super().__init__(client)
         self.application_commands: List[AppCommand] = []
+        self.commands_by_id: Dict[int, AppCommand] = {}
+        self.commands_by_name: Dict[str, Union[AppCommand, AppCommandGroup]] = {}
+        self.cache_path: Optional[str] = None
+        self.synced_hash: Optional[str] = None
+        self.metrics = Metrics()
+        self.errors = ErrorRegistry()
+
+        # Responses to errors raised by discord.py and by the checks shared
+        # between cogs. Cogs register responses to their own errors on load.
+        self.errors.register(CommandNotFound, "This command does not exist.")
+        self.errors.register(
+            NoPrivateMessage,
+            "This command cannot be used in private messages.",
+        )
+        self.errors.register(
+            BotMissingPermissions,
+            lambda error: "I am missing the following permissions: "
+            + ", ".join(error.missing_permissions),
+        )
+        self.errors.register(
+            MissingPermissions,
+            lambda error: "You are missing the following permissions: "
+            + ", ".join(error.missing_permissions),
+        )
+        self.errors.register(
+            MissingAnyRole,
+            lambda error: "You are missing the following roles: "
+            + ", ".join(f"<@&{role}>" for role in error.missing_roles),
+        )
+        self.errors.register(
+            MissingRole,
+            "You are missing the <@&{error.missing_role}> role.",
+        )
+        self.errors.register(
+            CommandOnCooldown,
+            "This command is on cooldown. "
+            "Try again in {error.retry_after:.2f} seconds.",
+        )
+        self.errors.register(
+            NotOwner,
+            "Only the owner of the bot can use this command.",
+        )
+
+    async def sync(self, *, guild: Optional[Snowflake] = None) -> List[AppCommand]:
+        commands = await super().sync(guild=guild)
+
+        if guild is None:
+            self.synced_hash = self.local_hash()
+            self.index_commands(commands)
+
+            if self.cache_path:
+                await self.save_commands(self.cache_path)
+
+        return commands
+
+    async def fetch_commands(
+        self, *, guild: Optional[Snowflake] = None
+    ) -> List[AppCommand]:
+        commands = await super().fetch_commands(guild=guild)
+
+        if guild is None:
+            self.index_commands(commands)
+
+            if self.cache_path:
+                await self.save_commands(self.cache_path)
 
-    async def sync(self, *args, **kwargs):
-        commands = await super().sync(*args, **kwargs)
-        self.application_commands = commands
         return commands
 
-    async def get_application_command(self, *, id: int) -> Optional[AppCommand]:
-        """Gets an application command by its ID"""
+    def index_commands(self, commands: List[AppCommand]) -> None:
+        """Indexes the application's global commands by ID and qualified name"""
+        self.application_commands = commands
+        self.commands_by_id = {command.id: command for command in commands}
+        self.commands_by_name = {}
+
+        stack: List[Union[AppCommand, AppCommandGroup]] = list(commands)
+
+        while stack:
+            command = stack.pop()
+
+            if isinstance(command, AppCommandGroup):
+                self.commands_by_name[command.qualified_name] = command
+            else:
+                self.commands_by_name[command.name] = command
+
+            stack.extend(
+                option
+                for option in command.options
+                if isinstance(option, AppCommandGroup)
+            )
+
+    def local_hash(self) -> str:
+        """Hashes the global commands as they would be sent when syncing"""
+        payload = sorted(
+            (command.to_dict(self) for command in self.get_commands()),
+            key=lambda command: (command.get("type", 1), command["name"]),
+        )
+
+        return sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    async def save_commands(self, path: str) -> None:
+        """Writes the fetched commands to the command cache, along with the
+        hash of the local commands they were last synced from"""
+        cache = {
+            "application_id": self.client.application_id,
+            "hash": self.synced_hash,
+            "commands": [
+                dump_command(command) for command in self.application_commands
+            ],
+        }
+
+        # run_in_executor rather than asyncio.to_thread, which needs 3.9.
+        await asyncio.get_running_loop().run_in_executor(None, write_cache, path, cache)
+
+    async def load_commands(self, path: str, *, sync: bool = True) -> None:
+        """Loads the application's global commands.
+
+        The commands are read from the cache at ``path`` when the local
+        commands have not changed since they were last synced. Otherwise
+        they are synced, or fetched if ``sync`` is False.
+
+        Only a process that syncs writes the cache, so processes of a
+        cluster that share it never overwrite the hash of the last sync."""
+        cache = await asyncio.get_running_loop().run_in_executor(None, read_cache, path)
+
+        if cache and cache["application_id"] == self.client.application_id:
+            self.synced_hash = cache["hash"]
+
+        self.cache_path = path if sync else None
+
+        if self.synced_hash is not None and self.synced_hash == self.local_hash():
+            self.index_commands(
+                [
+                    AppCommand(data=data, state=self._state)
+                    for data in cache["commands"]  # type: ignore
+                ]
+            )
+        elif sync:
+            log.info("Local application commands changed, syncing them")
+            await self.sync()
+        else:
+            log.warning("Local application commands differ from the last sync")
+            await self.fetch_commands()
+
+    async def get_application_command(
+        self,
+        *,
+        id: Optional[int] = None,
+        name: Optional[str] = None,
+    ) -> Optional[Union[AppCommand, AppCommandGroup]]:
+        """Gets an application command by its ID, or a command, group or
+        subcommand by its qualified name"""
         if not self.application_commands:
             await self.fetch_commands()
 
-        return next(
-            (command for command in self.application_commands if command.id == id),
-            None,
-        )
+        if id is not None:
+            return self.commands_by_id.get(id)
+
+        return self.commands_by_name.get(name)  # type: ignore
+
+    async def _call(self, interaction: Interaction) -> None:
+        # Errors are dispatched here rather than by the caller so that the time
+        # spent handling them counts towards the command's duration.
+        start = perf_counter()
+        timer = ResponseTimer(async_context.get())
+        async_context.set(timer)
+        db_time.set([0.0])
+
+        try:
+            await super()._call(interaction)
+        except AppCommandError as error:
+            await self._dispatch_error(interaction, error)
+        finally:
+            self.metrics.record(
+                self.metric_name(interaction),
+                perf_counter() - start,
+                timer.responded_at - start if timer.responded_at else None,
+                db_time.get()[0],  # type: ignore
+            )
 
-    async def fetch_commands(self):
-        self.application_commands = await super().fetch_commands()
-        return self.application_commands
+    @staticmethod
+    def metric_name(interaction: Interaction) -> str:
+        """Gets the name metrics for an interaction are recorded under"""
+        command = interaction.command
+        name = command.qualified_name if command else "unknown"
+
+        if interaction.type is InteractionType.autocomplete:
+            return f"{name} (autocomplete)"
+
+        return name
 
     async def on_error(self, interaction: Interaction, error: AppCommandError) -> None:
         """Handles errors that occur while invoking application commands"""
-        if isinstance(error, CommandNotFound):
-            await interaction.response.send_message(
-                "This command does not exist.",
-                ephemeral=True,
-            )
-        elif isinstance(error, NoPrivateMessage):
-            await interaction.response.send_message(
-                "This command cannot be used in private messages.",
-                ephemeral=True,
-            )
-        elif isinstance(error, BotMissingPermissions):
-            await interaction.response.send_message(
-                (
-                    "I am missing the following permissions: " ", ".join(
-                        error.missing_permissions
-                    )
-                ),
-                ephemeral=True,
-            )
-        elif isinstance(error, MissingAnyRole):
-            roles = [f"<@&{role}>" for role in error.missing_roles]
-            await interaction.response.send_message(
-                "You are missing the following roles: " ", ".join(roles),
-                allowed_mentions=AllowedMentions.none(),
-                ephemeral=True,
-            )
-        elif isinstance(error, MissingRole):
-            await interaction.response.send_message(
-                f"You are missing the <@&{error.missing_role}> role.",
-                ephemeral=True,
-                allowed_mentions=AllowedMentions.none(),
-            )
-        elif isinstance(error, MissingPermissions):
-            await interaction.response.send_message(
-                (
-                    "You are missing the following permissions: " ", ".join(
-                        error.missing_permissions
-                    ),
-                )
-            )
-        elif isinstance(error, CommandOnCooldown):
-            await interaction.response.send_message(
-                (
-                    f"This command is on cooldown. Try again in {error.retry_after:.2f}"
-                    "seconds."
-                )
-            )
-        elif isinstance(error, TagNotFound):
-            await interaction.response.send_message(
-                "This tag does not exist.",
-                ephemeral=True,
-            )
-        elif isinstance(error, TagExists):
-            await interaction.response.send_message(
-                "This tag already exists.",
-                ephemeral=True,
-            )
-        elif isinstance(error, MissingPermissionsForTagDeletion):
-            await interaction.response.send_message(
-                "You are missing permissions to delete this tag.",
-                ephemeral=True,
-            )
-        elif isinstance(error, MissingPermissionsForTagEdit):
-            await interaction.response.send_message(
-                "You are missing permissions to edit this tag.",
-                ephemeral=True,
-            )
-        elif isinstance(error, WarnNotFound):
-            await interaction.response.send_message(
-                "This warn does not exist.",
-                ephemeral=True,
-            )
-        elif isinstance(error, MissingGuildUserData):
-            await interaction.response.send_message(
-                "The data for your user indicates this has not been used in a server.",
-                ephemeral=True,
-            )
-        elif isinstance(error, BotFailedHierarchy):
-            await interaction.response.send_message(
-                (
-                    f"{error.target} is above me in roles, meaning I can't do that."
-                    "Please move me above them in roles and try again."
-                ),
-                ephemeral=True,
-            )
-        elif isinstance(error, FailedHierarchy):
-            await interaction.response.send_message(
-                (
-                    f"{error.target} is above you in roles, meaning you can't do that. "
-                    f"Make sure that {error.target.top_role} "
-                    f"(position {error.target.top_role.position}) "
-                    f"is below {error.invoker.top_role} (position"
-                    f"{error.invoker.top_role.position}). "
-                    "Please move them below you in roles and try again."
-                ),
-                ephemeral=True,
-            )
-        elif isinstance(error, CannotPerformActionOnBot):
-            await interaction.response.send_message(
-                "You cannot perform this action on a bot.",
-                ephemeral=True,
-            )
-        elif isinstance(error, CannotPerformActionOnSelf):
-            await interaction.response.send_message(
-                "You cannot perform this action on yourself.",
-                ephemeral=True,
-            )
-        elif isinstance(error, CannotPerformActionOnOwner):
-            await interaction.response.send_message(
-                "You cannot perform this action on the server owner.",
-                ephemeral=True,
-            )
-        elif isinstance(error, CannotPerformActionOnMe):
-            await interaction.response.send_message(
-                "You cannot perform this action on me.",
-                ephemeral=True,
-            )
-        elif isinstance(error, InvalidDuration):
-            await interaction.response.send_message(
-                f"{error.duration} is an invalid duration.",
-                ephemeral=True,
-            )
-        elif isinstance(error, DurationTooLong):
-            await interaction.response.send_message(
-                f"{error.duration} is too long.",
-                ephemeral=True,
-            )
-        elif isinstance(error, UserNotMuted):
-            await interaction.response.send_message(
-                "This user is not muted.",
-                ephemeral=True,
+        self.metrics.record_error(self.metric_name(interaction), error)
+
+        response = self.errors.resolve(type(error))
+
+        if response is None:
+            await UNKNOWN_ERROR.send(interaction, error)
+            log.error(
+                "Ignoring exception in command %r",
+                self.metric_name(interaction),
+                exc_info=error,
             )
         else:
-            await interaction.response.send_message(
-                "An unknown error occurred while running this command."
-            )
-            raise error
+            await response.send(interaction, error)
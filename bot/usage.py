@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from .storage import TagRepository
+
+log = logging.getLogger(__name__)
+
+
+class UsageCounter:
+    """Counts tag uses in memory and writes them to the database in batches.
+
+    Every ``interval`` seconds the counts gathered since the last flush are
+    written as one batch of increments, so a tag used a thousand times costs
+    one write rather than a thousand. Counts that fail to be written are
+    kept for the next flush, and whatever is left is flushed on stop."""
+
+    def __init__(self, tags: TagRepository, *, interval: float = 60.0):
+        self.tags = tags
+        self.interval = interval
+
+        self._counts: Counter[Tuple[int, str]] = Counter()
+        self._task: Optional[asyncio.Task[None]] = None
+
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="tag-uses")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        try:
+            await self.flush()
+        except Exception:
+            log.exception("Dropping %s unwritten tag uses", len(self._counts))
+
+    def record(self, guild_id: int, name: str) -> None:
+        self._counts[guild_id, name.lower()] += 1
+
+    def discard(self, guild_id: int, name: str) -> None:
+        """Drops the pending uses of a tag, e.g. when it is deleted, so they
+        aren't counted towards a new tag with the same name"""
+        self._counts.pop((guild_id, name.lower()), None)
+
+    async def flush(self) -> None:
+        if not self._counts:
+            return
+
+        # Swapped out before the write, so uses recorded while it is in
+        # flight go to the next batch.
+        counts, self._counts = self._counts, Counter()
+
+        try:
+            await self.tags.add_uses(counts)
+        except BaseException:
+            # Including cancellation on shutdown, so stop can retry them.
+            self.failed += 1
+            self._counts.update(counts)
+            raise
+
+        self.flushes += 1
+        self.written += len(counts)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Failed to write tag uses")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._counts),
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+        }
@@ -0,0 +1,303 @@
+"""Serves interactions delivered by Discord over HTTP instead of the gateway.
+
+Each worker answers the interactions POSTed to it without holding a gateway
+connection, so several can run behind a load balancer. Set the application's
+interactions endpoint URL to the load balancer and add an "interactions"
+section with the application's "public_key" to config.json.
+
+    python -m bot.webhook serve
+    python -m bot.webhook keygen
+    python -m bot.webhook post --private-key KEY [--payload interaction.json]
+
+``keygen`` and ``post`` stand in for Discord when testing locally: run the
+server with the generated public key and post signed payloads to it. Without
+``--payload`` a PING is posted.
+
+Any worker may receive any guild's interactions, so a worker keeps no state
+that another worker could make stale:
+
+- the tag and member caches are turned off, and the Tags cog looks up
+  autocomplete choices in the database instead of its in-memory indexes;
+- rate limit buckets are still per worker, but each worker gets an even
+  share of every rate; set "workers" in the "interactions" section to the
+  number of workers behind the load balancer;
+- guilds, their roles and the bot's own member are fetched over HTTP and
+  refetched after "guild_ttl" seconds, so role changes can take that long
+  to be seen by the hierarchy checks;
+- tag use counts are buffered before being added to the database, which
+  is safe since they are only ever added to.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from contextvars import copy_context
+from math import inf
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from aiohttp import ClientSession, FormData, web
+from discord import Guild, Member
+from discord.http import MultipartParameters
+from discord.webhook.async_ import async_context
+from nacl.exceptions import BadSignatureError
+from nacl.signing import SigningKey, VerifyKey
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+log = logging.getLogger(__name__)
+
+PING = 1
+PONG = 1
+
+# Discord gives up on an interaction if it isn't responded to in time.
+RESPONSE_TIMEOUT = 3.0
+MAX_CLOCK_SKEW = 300
+
+
+class WebhookResponder:
+    """Wraps the webhook adapter used by an interaction, so that its first
+    response is sent back as the HTTP response to Discord's request instead
+    of to the interaction callback endpoint"""
+
+    def __init__(self, adapter: Any):
+        self.adapter = adapter
+        loop = asyncio.get_running_loop()
+        self.response: asyncio.Future[MultipartParameters] = loop.create_future()
+        self.sent: asyncio.Future[None] = loop.create_future()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.adapter, name)
+
+    async def create_interaction_response(
+        self,
+        interaction_id: int,
+        token: str,
+        *,
+        params: MultipartParameters,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        if self.response.done():
+            return await self.adapter.create_interaction_response(
+                interaction_id, token, params=params, **kwargs
+            )
+
+        self.response.set_result(params)
+
+        # Follow-ups made before Discord has the response would fail.
+        await self.sent
+
+        return {
+            "interaction": {
+                "id": str(interaction_id),
+                "type": (params.payload or {}).get("type"),
+            }
+        }
+
+
+class InteractionServer:
+    """Receives interactions over HTTP and dispatches them to the bot the same
+    way they would be dispatched from the gateway"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        public_key: str,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        path: str = "/interactions",
+        guild_ttl: float = 300.0,
+    ):
+        self.bot = bot
+        self.verify_key = VerifyKey(bytes.fromhex(public_key))
+        self.host = host
+        self.port = port
+        self.path = path
+        self.guild_ttl = guild_ttl
+        self.fetched: Dict[int, float] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def verify(self, request: web.Request, body: bytes) -> bool:
+        """Checks the request was signed by Discord"""
+        signature = request.headers.get("X-Signature-Ed25519", "")
+        timestamp = request.headers.get("X-Signature-Timestamp", "")
+
+        try:
+            if abs(time.time() - int(timestamp)) > MAX_CLOCK_SKEW:
+                return False
+
+            self.verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+        except (ValueError, BadSignatureError):
+            return False
+
+        return True
+
+    async def ensure_guild(self, guild_id: int) -> None:
+        """Fetches a guild's roles and the bot's own member over HTTP.
+
+        No gateway events arrive to fill the cache in this mode, and the
+        hierarchy checks need both. They are refetched after ``guild_ttl``
+        seconds to pick up changes to roles."""
+        if self.fetched.get(guild_id, -inf) > time.monotonic() - self.guild_ttl:
+            return
+
+        state = self.bot._connection
+        guild = Guild(data=await self.bot.http.get_guild(guild_id), state=state)
+        me = await self.bot.http.get_member(guild_id, state.self_id)  # type: ignore
+        guild._add_member(Member(data=me, guild=guild, state=state))
+        state._add_guild(guild)
+        self.fetched[guild_id] = time.monotonic()
+
+    def dispatch(self, payload: Dict[str, Any], responder: WebhookResponder) -> None:
+        # The tasks created to handle the interaction copy the current
+        # context, so they all respond through the responder.
+        async_context.set(responder)
+        self.bot._connection.parse_interaction_create(payload)  # type: ignore
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+
+        if not self.verify(request, body):
+            return web.Response(status=401, text="Invalid request signature")
+
+        payload = json.loads(body)
+
+        if payload["type"] == PING:
+            return web.json_response({"type": PONG})
+
+        if "guild_id" in payload:
+            await self.ensure_guild(int(payload["guild_id"]))
+
+        responder = WebhookResponder(async_context.get())
+        copy_context().run(self.dispatch, payload, responder)
+
+        try:
+            # A response made after this fails on its own, as it goes to the
+            # callback endpoint of an interaction Discord has given up on.
+            params = await asyncio.wait_for(responder.response, RESPONSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning("Interaction %s was not responded to in time", payload["id"])
+            return web.Response(status=500)
+
+        if params.files:
+            form = FormData()
+
+            for field in params.multipart or []:
+                form.add_field(**field)
+
+            response = web.Response(body=form())
+        else:
+            response = web.json_response(params.payload)
+
+        try:
+            await response.prepare(request)
+            await response.write_eof()
+        finally:
+            responder.sent.set_result(None)
+
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info(
+            "Serving interactions on http://%s:%s%s", self.host, self.port, self.path
+        )
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(config: Dict[str, Any]) -> None:
+    from .bot import Bot, discover_cogs
+
+    # READY never arrives without a gateway connection, so nothing can be
+    # deferred until after it.
+    config = {
+        **config,
+        "extensions": [
+            *config.get("extensions", ["jishaku", *discover_cogs()]),
+            *config.get("deferred_extensions", []),
+        ],
+        "deferred_extensions": [],
+        "http_interactions": True,
+        "tag_cache_size": 0,
+        "member_cache_size": 0,
+    }
+    interactions = dict(config["interactions"])
+    config["ratelimit_workers"] = interactions.pop("workers", 1)
+
+    bot = Bot(config)
+    server = InteractionServer(bot, **interactions)
+
+    async with bot:
+        await bot.login(config["token"])
+        await server.start()
+        bot.startup.finish(config.get("startup_reports", "startup.jsonl"))
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+
+async def post(url: str, private_key: str, payload: Dict[str, Any]) -> None:
+    """Posts a payload signed the way Discord signs interactions"""
+    body = json.dumps(payload).encode()
+    timestamp = str(int(time.time()))
+    signature = SigningKey(bytes.fromhex(private_key)).sign(timestamp.encode() + body)
+
+    async with ClientSession() as session, session.post(
+        url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-Signature-Ed25519": signature.signature.hex(),
+            "X-Signature-Timestamp": timestamp,
+        },
+    ) as response:
+        print(response.status, await response.text())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="Serve interactions using config.json")
+    commands.add_parser("keygen", help="Generate a key pair for local testing")
+    poster = commands.add_parser("post", help="Post a signed interaction")
+    poster.add_argument("--url", default="http://127.0.0.1:8080/interactions")
+    poster.add_argument("--private-key", required=True)
+    poster.add_argument("--payload", help="A JSON file with the interaction")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO)
+
+        with open("config.json") as f:
+            config = json.load(f)
+
+        asyncio.run(serve(config))
+    elif args.command == "keygen":
+        key = SigningKey.generate()
+        print(f"private key: {bytes(key).hex()}")
+        print(f"public key:  {bytes(key.verify_key).hex()}")
+    else:
+        if args.payload:
+            with open(args.payload) as f:
+                payload = json.load(f)
+        else:
+            payload = {"type": PING}
+
+        asyncio.run(post(args.url, args.private_key, payload))
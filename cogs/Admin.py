@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, DefaultDict, Optional
+
+from discord import Interaction, Permissions
+from discord.app_commands import Group, NoPrivateMessage, Range, describe
+from discord.ext.commands import Cog
+
+from .utils import is_owner
+
+if TYPE_CHECKING:
+    from ..bot import Bot
+
+
+class Admin(Cog):
+    def __init__(self, bot: Bot):
+        self.bot = bot
+
+    admin = Group(
+        name="admin",
+        description="Commands for maintaining the bot",
+        default_permissions=Permissions(
+            administrator=True,
+        ),
+        guild_only=True,
+    )
+
+    @admin.command(
+        name="backfill-guild",
+        description="Assigns tags and warns stored without a server to a server",
+    )
+    @describe(
+        guild_id="The ID of the server to assign documents to, defaults to this one",
+        batch_size="How many documents to update at a time",
+    )
+    @is_owner()
+    async def backfill_guild(
+        self,
+        interaction: Interaction,
+        guild_id: Optional[str] = None,
+        batch_size: Range[int, 1, 10000] = 1000,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        await interaction.response.defer(ephemeral=True)
+
+        target = int(guild_id) if guild_id else interaction.guild.id
+
+        tags = await self.bot.tags.backfill_guild(target, batch_size=batch_size)
+        warns = await self.bot.warns.backfill_guild(target, batch_size=batch_size)
+
+        await interaction.edit_original_response(
+            content=f"Assigned {tags} tags and {warns} warns to `{target}`"
+        )
+
+    @admin.command(
+        name="stats",
+        description="Shows how long commands take and how often they fail",
+    )
+    @is_owner()
+    async def stats(self, interaction: Interaction):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        metrics = self.bot.tree.metrics
+        errors: DefaultDict[str, int] = defaultdict(int)
+
+        for (command, _), count in metrics.errors.items():
+            errors[command] += count
+
+        lines = [
+            (
+                f"{'Command':<28} {'Runs':>6} {'Mean':>7} {'p95':>7} "
+                f"{'First':>7} {'DB':>7} {'Errors':>6}"
+            )
+        ]
+
+        for command, duration in sorted(
+            metrics.duration.items(), key=lambda item: -item[1].count
+        ):
+            first = metrics.first_response.get(command)
+            lines.append(
+                f"{command[:28]:<28} {duration.count:>6} "
+                f"{duration.mean * 1000:>5.0f}ms "
+                f"{duration.quantile(0.95) * 1000:>5.0f}ms "
+                f"{(first.mean if first else 0) * 1000:>5.0f}ms "
+                f"{metrics.db[command].mean * 1000:>5.0f}ms {errors[command]:>6}"
+            )
+
+        for name, values in self.bot.gauges().items():
+            lines.append(
+                f"{name}: "
+                + ", ".join(
+                    (
+                        f"{kind}={value:.2f}"
+                        if isinstance(value, float)
+                        else f"{kind}={value}"
+                    )
+                    for kind, value in values.items()
+                )
+            )
+
+        table = "\n".join(lines)
+
+        # Keep the table within Discord's message length limit.
+        await interaction.response.send_message(
+            f"```\n{table[:1990]}\n```",
+            ephemeral=True,
+        )
+
+
+async def setup(bot: Bot):
+    await bot.add_cog(Admin(bot))
@@ -1,11 +1,38 @@
 from __future__ import annotations
 
-from contextlib import suppress
-from datetime import timedelta
-from typing import TYPE_CHECKING
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from tempfile import TemporaryFile
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
-from discord import Forbidden, Interaction, Member, Permissions, File, User
+from bson import ObjectId
+from discord import (
+    AllowedMentions,
+    Forbidden,
+    Guild,
+    HTTPException,
+    Interaction,
+    Member,
+    NotFound,
+    Permissions,
+    File,
+    Role,
+    User,
+)
 from discord.app_commands import (
+    AppCommandError,
     Group,
     Range,
     command,
@@ -14,12 +41,17 @@ from discord.app_commands import (
     NoPrivateMessage,
 )
 from discord.ext.commands import Cog
+from discord.utils import format_dt
+
+from bot.storage import Job, Warn
 
 from .utils import (
     WarnNotFound,
     Confirm,
     FailedHierarchy,
     BotFailedHierarchy,
+    FailedRoleHierarchy,
+    BotFailedRoleHierarchy,
     MissingGuildUserData,
     CannotPerformActionOnBot,
     CannotPerformActionOnSelf,
@@ -28,18 +60,417 @@ from .utils import (
     InvalidDuration,
     DurationTooLong,
     UserNotMuted,
+    TooManyTargets,
+    KeysetPaginator,
     generate_code,
+    ratelimit,
     format_timedelta,
     format_reason,
 )
 
 if TYPE_CHECKING:
     from ..bot import Bot
+    from bot.errors import Template
+
+
+log = logging.getLogger(__name__)
+
+WARNS_PAGE_SIZE = 5
+WARN_SWEEP_INTERVAL = 300
+WARN_SWEEP_BATCH = 1000
+
+
+MAX_TIMEOUT = timedelta(days=28)
+# Mutes longer than Discord allows are reapplied before each timeout runs out.
+MAX_MUTE = timedelta(days=3650)
+TIMEOUT_OVERLAP = timedelta(hours=1)
+MAX_BULK_TARGETS = 250
+USER_ID = re.compile(r"\d{15,20}")
+
+BULK_FAILURE_REASONS: Dict[Type[Exception], str] = {
+    FailedHierarchy: "is above you in roles",
+    BotFailedHierarchy: "is above me in roles",
+    CannotPerformActionOnMe: "is me",
+    CannotPerformActionOnBot: "is a bot",
+    CannotPerformActionOnSelf: "is you",
+    CannotPerformActionOnOwner: "is the server owner",
+    UserNotMuted: "is not muted",
+    NotFound: "is not in this server",
+    Forbidden: "could not be acted on, I am missing permissions",
+}
+
+
+ERROR_RESPONSES: Dict[Type[Exception], Template] = {
+    WarnNotFound: "This warn does not exist.",
+    MissingGuildUserData: (
+        "The data for your user indicates this has not been used in a server."
+    ),
+    BotFailedHierarchy: (
+        "{error.target} is above me in roles, meaning I can't do that. "
+        "Please move me above them in roles and try again."
+    ),
+    FailedHierarchy: (
+        "{error.target} is above you in roles, meaning you can't do that. "
+        "Make sure that {error.target.top_role} "
+        "(position {error.target.top_role.position}) "
+        "is below {error.invoker.top_role} "
+        "(position {error.invoker.top_role.position}). "
+        "Please move them below you in roles and try again."
+    ),
+    CannotPerformActionOnBot: "You cannot perform this action on a bot.",
+    CannotPerformActionOnSelf: "You cannot perform this action on yourself.",
+    CannotPerformActionOnOwner: "You cannot perform this action on the server owner.",
+    CannotPerformActionOnMe: "You cannot perform this action on me.",
+    InvalidDuration: "{error.duration} is an invalid duration.",
+    DurationTooLong: "{error.duration} is too long.",
+    UserNotMuted: "This user is not muted.",
+    TooManyTargets: (
+        "That is {error.count} users, but at most {error.limit} can be "
+        "targeted at once. Please split them up and try again."
+    ),
+    FailedRoleHierarchy: (
+        "{error.role} is above your top role, meaning you can't do that."
+    ),
+    BotFailedRoleHierarchy: (
+        "{error.role} is above my top role, meaning I can't do that. "
+        "Please move me above it in roles and try again."
+    ),
+}
+
+
+def format_warn(warn: Warn) -> str:
+    return f"{warn['warn_id']} - {warn['reason']} - <@{warn['moderator']}>"
+
+
+def make_duration(days: int, hours: int, minutes: int, seconds: int) -> timedelta:
+    """Builds a duration for a timed action, checking that it isn't empty or
+    longer than ``MAX_MUTE``"""
+    duration = timedelta(
+        days=days,
+        hours=hours,
+        minutes=minutes,
+        seconds=seconds,
+    )
+
+    if duration.total_seconds() == 0:
+        raise InvalidDuration(duration.total_seconds())
+
+    if duration > MAX_MUTE:
+        raise DurationTooLong(duration.total_seconds())
+
+    return duration
+
+
+def format_bulk_results(results: List[Tuple[int, Optional[Exception]]]) -> str:
+    lines = []
+
+    for user_id, error in results:
+        if error is None:
+            lines.append(f"{user_id}: done")
+        else:
+            reason = next(
+                (
+                    reason
+                    for cls, reason in BULK_FAILURE_REASONS.items()
+                    if isinstance(error, cls)
+                ),
+                f"failed ({type(error).__name__})",
+            )
+            lines.append(f"{user_id}: {reason}")
+
+    return "\n".join(lines)
+
+
+def window_start(window: timedelta) -> datetime:
+    """The start of a window of time ending now"""
+    return datetime.now(timezone.utc) - window
 
 
 class Moderation(Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        # Shared by every bulk command, so concurrent raids in many guilds
+        # can't flood the HTTP client with more requests than it can pace.
+        self.bulk_limit = asyncio.Semaphore(self.bot.config.get("bulk_concurrency", 5))
+
+    async def cog_load(self) -> None:
+        for error, template in ERROR_RESPONSES.items():
+            self.bot.tree.errors.register(error, template)
+
+        self.bot.scheduler.register("timeout", self.continue_timeout)
+        self.bot.scheduler.register("remove_role", self.remove_temporary_role)
+        self.sweeper = asyncio.create_task(self.sweep_warns())
+
+    async def cog_unload(self) -> None:
+        for error in ERROR_RESPONSES:
+            self.bot.tree.errors.unregister(error)
+
+        for kind in ("timeout", "remove_role"):
+            self.bot.scheduler.unregister(kind)
+
+        self.sweeper.cancel()
+
+    async def timeout(self, member: Member, duration: timedelta, reason: str) -> None:
+        """Times a member out, scheduling the timeout to be reapplied if it
+        is longer than Discord allows"""
+        guild_id = member.guild.id
+        await self.bot.scheduler.cancel("timeout", guild_id, member.id)
+        await member.timeout(min(duration, MAX_TIMEOUT), reason=reason)
+        self.bot.member_cache.invalidate((guild_id, member.id))
+
+        if duration > MAX_TIMEOUT:
+            now = datetime.now(timezone.utc)
+            await self.bot.scheduler.schedule(
+                "timeout",
+                guild_id,
+                member.id,
+                now + MAX_TIMEOUT - TIMEOUT_OVERLAP,
+                until=(now + duration).isoformat(),
+            )
+
+    async def untimeout(self, member: Member, reason: str) -> None:
+        await self.bot.scheduler.cancel("timeout", member.guild.id, member.id)
+        await member.timeout(None, reason=reason)
+        self.bot.member_cache.invalidate((member.guild.id, member.id))
+
+    async def continue_timeout(self, job: Job) -> None:
+        """Reapplies a mute longer than Discord allows, for as long as it can"""
+        until = datetime.fromisoformat(job["data"]["until"])
+        now = datetime.now(timezone.utc)
+
+        if until <= now:
+            return
+
+        # Goes through HTTP, as the member may not be cached, and fetching
+        # them first would only cost another request.
+        await self.bot.http.edit_member(
+            job["guild"],
+            job["user"],
+            communication_disabled_until=min(until, now + MAX_TIMEOUT).isoformat(),
+            reason="Continuing a mute longer than 28 days",
+        )
+        self.bot.member_cache.invalidate((job["guild"], job["user"]))
+
+        if until - now > MAX_TIMEOUT:
+            await self.bot.scheduler.schedule(
+                "timeout",
+                job["guild"],
+                job["user"],
+                now + MAX_TIMEOUT - TIMEOUT_OVERLAP,
+                until=job["data"]["until"],
+            )
+
+    async def remove_temporary_role(self, job: Job) -> None:
+        await self.bot.http.remove_role(
+            job["guild"],
+            job["user"],
+            job["data"]["role"],
+            reason="Temporary role expired",
+        )
+        self.bot.member_cache.invalidate((job["guild"], job["user"]))
+
+    async def sweep_warns(self) -> None:
+        """Removes expired warns in the background.
+
+        Expired warns are already left out of every query, so this only
+        keeps them from piling up in the database and its indexes."""
+        while True:
+            try:
+                removed = await self.bot.warns.prune_expired(
+                    datetime.now(timezone.utc), batch_size=WARN_SWEEP_BATCH
+                )
+            except Exception:
+                log.exception("Failed to remove expired warns")
+            else:
+                if removed:
+                    log.info("Removed %s expired warns", removed)
+
+            await asyncio.sleep(WARN_SWEEP_INTERVAL)
+
+    def check_hierarchy(self, guild: Guild, invoker: Member, user: Member) -> None:
+        """Raises if ``invoker`` may not moderate ``user``"""
+        if invoker.top_role <= user.top_role:
+            raise FailedHierarchy(invoker, user)
+        elif guild.me.top_role <= user.top_role:
+            raise BotFailedHierarchy(user)
+        elif self.bot.user and user.id == self.bot.user.id:
+            raise CannotPerformActionOnMe
+        elif user.bot:
+            raise CannotPerformActionOnBot
+        elif user.id == invoker.id:
+            raise CannotPerformActionOnSelf
+        elif user.id == guild.owner_id:
+            raise CannotPerformActionOnOwner
+
+    async def fan_out(
+        self,
+        targets: Iterable[int],
+        action: Callable[[int], Awaitable[None]],
+    ) -> List[Tuple[int, Optional[Exception]]]:
+        """Runs ``action`` for every target with bounded concurrency,
+        returning each target alongside the error it failed with, if any.
+
+        discord.py already waits out the rate limit bucket of each route, so
+        the limit here only stops a bulk action from queueing hundreds of
+        requests at once."""
+
+        async def run(target: int) -> Tuple[int, Optional[Exception]]:
+            async with self.bulk_limit:
+                try:
+                    await action(target)
+                except (AppCommandError, HTTPException) as error:
+                    return target, error
+
+            return target, None
+
+        return await asyncio.gather(*(run(target) for target in targets))
+
+    async def get_member(self, guild: Guild, user_id: int) -> Member:
+        """Gets a member from the caches, fetching them if they aren't cached"""
+        member = guild.get_member(user_id) or self.bot.member_cache.get(
+            (guild.id, user_id)
+        )
+
+        if member is None:
+            member = await guild.fetch_member(user_id)
+            self.bot.member_cache.set((guild.id, user_id), member)
+
+        return member
+
+    async def role_members(self, guild: Guild, role: Role) -> List[Member]:
+        """Gets the members with a role, requesting the guild's members from
+        the gateway without caching them if the guild isn't chunked"""
+        if guild.chunked:
+            return role.members
+
+        return [
+            member
+            for member in await guild.chunk(cache=False)
+            if member.get_role(role.id)
+        ]
+
+    async def resolve_targets(
+        self,
+        guild: Guild,
+        users: Optional[str],
+        role: Optional[Role],
+    ) -> Tuple[List[Member], List[Tuple[int, Optional[Exception]]]]:
+        """Resolves the members named by a list of mentions or IDs and a role,
+        returning them alongside the IDs that could not be resolved.
+
+        Raises TooManyTargets, before fetching anyone, if together they name
+        more than ``MAX_BULK_TARGETS`` users."""
+        members = (
+            {member.id: member for member in await self.role_members(guild, role)}
+            if role
+            else {}
+        )
+        missing = [
+            user_id
+            for user_id in dict.fromkeys(map(int, USER_ID.findall(users or "")))
+            if user_id not in members
+        ]
+
+        if len(members) + len(missing) > MAX_BULK_TARGETS:
+            raise TooManyTargets(len(members) + len(missing), MAX_BULK_TARGETS)
+
+        async def fetch(user_id: int):
+            members[user_id] = await self.get_member(guild, user_id)
+
+        failures = [
+            result
+            for result in await self.fan_out(missing, fetch)
+            if result[1] is not None
+        ]
+
+        return list(members.values()), failures
+
+    async def send_bulk_results(
+        self,
+        interaction: Interaction,
+        action: str,
+        results: List[Tuple[int, Optional[Exception]]],
+        *,
+        note: str = "",
+    ):
+        succeeded = sum(error is None for _, error in results)
+
+        await interaction.edit_original_response(
+            content=f"{action} {succeeded} of {len(results)} users{note}.",
+            attachments=[
+                File(
+                    format_bulk_results(results).encode("utf-8"),
+                    "results.txt",
+                )
+            ],
+        )
+
+    def warn_expiry(self, guild_id: int, days: Optional[int]) -> Optional[datetime]:
+        """When a warn made now expires, given the days it was set to expire
+        in, if any, and the guild's default from the config.
+
+        Configured in days as ``{"default": 90, "<guild id>": 30}``. A guild
+        set to null keeps its warns forever unless they are given an expiry."""
+        if days is None:
+            expiry = self.bot.config.get("warn_expiry", {})
+            days = expiry.get(str(guild_id), expiry.get("default"))
+
+        if not days:
+            return None
+
+        return datetime.now(timezone.utc) + timedelta(days=days)
+
+    @property
+    def escalation(self) -> Optional[dict]:
+        """The automatic escalation policy from the config, if any.
+
+        Configured as ``{"warns": 3, "window": 86400, "timeout": 3600}``:
+        a user reaching ``warns`` warns within ``window`` seconds is timed
+        out for ``timeout`` seconds."""
+        return self.bot.config.get("escalation")
+
+    def escalation_skipped(self, interaction: Interaction) -> str:
+        """A note for the reply to a warn when the escalation policy was not
+        applied because the invoker can't time members out themselves"""
+        if not self.escalation or interaction.permissions.moderate_members:
+            return ""
+
+        return (
+            ". Automatic escalation was skipped as you don't have the"
+            " Moderate Members permission"
+        )
+
+    async def escalate(self, guild: Guild, user: Member) -> Optional[timedelta]:
+        """Applies the escalation policy after a warn, returning the timeout
+        applied, if any"""
+        policy = self.escalation
+
+        if not policy or user.is_timed_out():
+            return None
+
+        # Counting stops at the threshold, so this never reads more than
+        # ``policy["warns"]`` index entries however long the history is.
+        recent = await self.bot.warns.count_since(
+            guild.id,
+            user.id,
+            window_start(timedelta(seconds=policy["window"])),
+            limit=policy["warns"],
+        )
+
+        if recent < policy["warns"]:
+            return None
+
+        duration = min(timedelta(seconds=policy["timeout"]), MAX_TIMEOUT)
+
+        try:
+            await user.timeout(
+                duration,
+                reason=f"Reached {recent} warns within {policy['window']} seconds",
+            )
+        except Forbidden:
+            return None
+
+        return duration
 
     warns = Group(
         name="warns",
@@ -57,35 +488,62 @@ class Moderation(Cog):
     @describe(
         user="The user to warn",
         reason="The reason for the warn",
+        expires_in="The days until the warn expires, defaults to the server's",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     @checks.has_permissions(manage_messages=True)
     async def warns_add(
         self,
         interaction: Interaction,
         user: Member,
         reason: Range[str, 1, 256],
+        expires_in: Optional[Range[int, 1, 3650]] = None,
     ):
         if not interaction.guild:  # Needed to silence Ruff
             raise NoPrivateMessage
 
+        if isinstance(interaction.user, User):
+            raise MissingGuildUserData
+
         await interaction.response.defer(ephemeral=True)
 
-        await self.bot.warns.insert_one(
-            {
-                "user": user.id,
-                "reason": reason,
-                "moderator": interaction.user.id,
-                "warn_id": generate_code(16),
-            }
-        )
+        # Checked before the warn is added, as the warn may escalate to a
+        # timeout that /mute would have refused.
+        self.check_hierarchy(interaction.guild, interaction.user, user)
 
-        with suppress(Forbidden):
-            await user.send(
-                f"You have been warned in {interaction.guild.name}. Reason: `{reason}`"
+        await self.bot.warns.add(
+            Warn(
+                guild=interaction.guild.id,
+                user=user.id,
+                reason=reason,
+                moderator=interaction.user.id,
+                warn_id=generate_code(16),
+                expires=self.warn_expiry(interaction.guild.id, expires_in),
             )
+        )
+
+        self.bot.notifications.enqueue(
+            user,
+            f"You have been warned in {interaction.guild.name}. Reason: `{reason}`",
+        )
+
+        timeout = (
+            await self.escalate(interaction.guild, user)
+            if interaction.permissions.moderate_members
+            else None
+        )
 
         await interaction.edit_original_response(
-            content=f"Warned {user.mention} for `{reason}`"
+            content=(
+                f"Warned {user.mention} for `{reason}`"
+                + (
+                    f" and muted them for {format_timedelta(timeout)}"
+                    " due to repeated warns"
+                    if timeout
+                    else ""
+                )
+                + self.escalation_skipped(interaction)
+            )
         )
 
     @warns.command(
@@ -96,6 +554,7 @@ class Moderation(Cog):
         user="The user to remove the warn from",
         warn_id="The ID of the warn to remove",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     @checks.has_permissions(manage_messages=True)
     async def warns_remove(
         self,
@@ -108,9 +567,7 @@ class Moderation(Cog):
 
         await interaction.response.defer(ephemeral=True)
 
-        deleted = await self.bot.warns.delete_one({"user": user.id, "warn_id": warn_id})
-
-        if deleted.deleted_count == 0:
+        if not await self.bot.warns.remove(interaction.guild.id, user.id, warn_id):
             raise WarnNotFound
 
         await interaction.edit_original_response(
@@ -124,6 +581,7 @@ class Moderation(Cog):
     @describe(
         user="The user to list the warns for",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     @checks.has_permissions(manage_messages=True)
     async def warns_list(
         self,
@@ -135,28 +593,121 @@ class Moderation(Cog):
 
         await interaction.response.defer(ephemeral=True)
 
-        warns = [warn async for warn in self.bot.warns.find({"user": user.id})]
+        guild_id = interaction.guild.id
+
+        async def fetch(after: Optional[ObjectId], limit: int) -> List[Warn]:
+            return await self.bot.warns.page(
+                guild_id, user.id, after=after, limit=limit
+            )
+
+        def format_page(warns: List[Warn], page: int) -> str:
+            return "\n".join(
+                [f"Warns for {user.mention} (page {page})"]
+                + [format_warn(warn) for warn in warns]
+            )
+
+        paginator = KeysetPaginator(
+            fetch,
+            format_page,
+            author_id=interaction.user.id,
+            page_size=WARNS_PAGE_SIZE,
+        )
+        content = await paginator.load()
 
-        if not warns:
+        if not paginator.page:
             return await interaction.edit_original_response(
                 content=f"{user.mention} has no warns"
             )
 
-        warns_file_content = "\n".join(
-            [
-                f"{warn['warn_id']} - {warn['reason']} - <@{warn['moderator']}>"
-                for warn in warns
-            ]
+        await interaction.edit_original_response(
+            content=content,
+            view=paginator,
+            allowed_mentions=AllowedMentions.none(),
         )
 
-        await interaction.edit_original_response(
-            content=f"Warns for {user.mention}",
-            attachments=[
-                File(
-                    warns_file_content.encode("utf-8"),
-                    f"{user.id}_warns.txt",
+    @warns.command(
+        name="export",
+        description="Exports all warns for a user to a file",
+    )
+    @describe(
+        user="The user to export the warns for",
+    )
+    @ratelimit(user=(1, 30), global_=(20, 60))
+    @checks.has_permissions(manage_messages=True)
+    async def warns_export(
+        self,
+        interaction: Interaction,
+        user: Member,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        await interaction.response.defer(ephemeral=True)
+
+        # Written line by line to disk as the cursor is consumed, so long
+        # histories are never held in memory as one string. A spooled file
+        # would be smaller for short histories, but discord.File only takes
+        # it as a file object on Python 3.11 and newer.
+        with TemporaryFile() as fp:
+            async for warn in self.bot.warns.iterate(interaction.guild.id, user.id):
+                fp.write(f"{format_warn(warn)}\n".encode())
+
+            if not fp.tell():
+                return await interaction.edit_original_response(
+                    content=f"{user.mention} has no warns"
                 )
-            ],
+
+            fp.seek(0)
+
+            await interaction.edit_original_response(
+                content=f"Warns for {user.mention}",
+                attachments=[File(fp, f"{user.id}_warns.txt")],
+            )
+
+    @warns.command(
+        name="stats",
+        description="Shows warn statistics for a user",
+    )
+    @describe(
+        user="The user to show the statistics for",
+    )
+    @ratelimit(user=(5, 10), guild=(30, 60))
+    @checks.has_permissions(manage_messages=True)
+    async def warns_stats(
+        self,
+        interaction: Interaction,
+        user: Member,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        await interaction.response.defer(ephemeral=True)
+
+        window = timedelta(
+            seconds=(self.escalation or {}).get("window", 30 * 24 * 60 * 60)
+        )
+
+        stats = await self.bot.warns.stats(
+            interaction.guild.id,
+            user.id,
+            window_start(window),
+        )
+
+        if not stats:
+            return await interaction.edit_original_response(
+                content=f"{user.mention} has no warns"
+            )
+
+        await interaction.edit_original_response(
+            content=(
+                f"Warn statistics for {user.mention}\n"
+                f"Total warns: {stats['total']}\n"
+                f"Warns in the last {format_timedelta(window)}: {stats['recent']}\n"
+                f"Warned by {stats['moderators']} moderators\n"
+                f"First warn: {format_dt(stats['first'], 'R')}\n"
+                f"Last warn: {format_dt(stats['last'], 'R')}"
+            ),
+            allowed_mentions=AllowedMentions.none(),
         )
 
     @warns.command(
@@ -166,6 +717,7 @@ class Moderation(Cog):
     @describe(
         user="The user to clear the warns for",
     )
+    @ratelimit(user=(2, 10), guild=(10, 60))
     @checks.has_permissions(manage_messages=True)
     async def warns_clear(
         self,
@@ -187,7 +739,7 @@ class Moderation(Cog):
         if confirm.value is False:
             await interaction.edit_original_response(content="Cancelled.")
 
-        await self.bot.warns.delete_many({"user": user.id})
+        await self.bot.warns.clear(interaction.guild.id, user.id)
 
         await interaction.edit_original_response(
             content=f"Cleared all warns for {user.mention}"
@@ -205,6 +757,7 @@ class Moderation(Cog):
         minutes="The minutes to mute for",
         seconds="The seconds to mute for",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     @checks.has_permissions(moderate_members=True)
     @checks.bot_has_permissions(moderate_members=True)
     async def mute(
@@ -212,7 +765,7 @@ class Moderation(Cog):
         interaction: Interaction,
         user: Member,
         reason: Range[str, 1, 256],
-        days: Range[int, 0, 28] = 0,
+        days: Range[int, 0, 3650] = 0,
         hours: Range[int, 0, 24] = 0,
         minutes: Range[int, 0, 60] = 0,
         seconds: Range[int, 0, 60] = 0,
@@ -230,33 +783,18 @@ class Moderation(Cog):
 
         await interaction.response.defer(ephemeral=True)
 
-        if interaction.user.top_role <= user.top_role:
-            raise FailedHierarchy(interaction.user, user)
-        elif interaction.guild.me.top_role <= user.top_role:
-            raise BotFailedHierarchy(user)
-        elif user.id == self.bot.user.id:
-            raise CannotPerformActionOnMe
-        elif user.bot:
-            raise CannotPerformActionOnBot
-        elif user.id == interaction.user.id:
-            raise CannotPerformActionOnSelf
-        elif user.id == interaction.guild.owner_id:
-            raise CannotPerformActionOnOwner
-
-        duration = timedelta(
-            days=days,
-            hours=hours,
-            minutes=minutes,
-            seconds=seconds,
-        )
+        self.check_hierarchy(interaction.guild, interaction.user, user)
 
-        if duration.total_seconds() == 0:
-            raise InvalidDuration(duration.total_seconds())
+        duration = make_duration(days, hours, minutes, seconds)
 
-        if duration.total_seconds() > timedelta(days=28).total_seconds():
-            raise DurationTooLong(duration.total_seconds())
-
-        await user.timeout(duration, reason=format_reason(interaction.user, reason))
+        await self.timeout(user, duration, format_reason(interaction.user, reason))
+        self.bot.notifications.enqueue(
+            user,
+            (
+                f"You have been muted in {interaction.guild.name} for "
+                f"{format_timedelta(duration)}. Reason: `{reason}`"
+            ),
+        )
 
         await interaction.edit_original_response(
             content=(
@@ -273,6 +811,7 @@ class Moderation(Cog):
         user="The user to unmute",
         reason="The reason for the unmute",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     @checks.has_permissions(moderate_members=True)
     @checks.bot_has_permissions(moderate_members=True)
     async def unmute(
@@ -297,27 +836,270 @@ class Moderation(Cog):
 
         await interaction.response.defer(ephemeral=True)
 
-        if interaction.user.top_role <= user.top_role:
-            raise FailedHierarchy(interaction.user, user)
-        elif interaction.guild.me.top_role <= user.top_role:
-            raise BotFailedHierarchy(user)
-        elif user.id == self.bot.user.id:
-            raise CannotPerformActionOnMe
-        elif user.bot:
-            raise CannotPerformActionOnBot
-        elif user.id == interaction.user.id:
-            raise CannotPerformActionOnSelf
-        elif user.id == interaction.guild.owner_id:
-            raise CannotPerformActionOnOwner
-        elif user.timed_out_until is None:
+        self.check_hierarchy(interaction.guild, interaction.user, user)
+
+        if user.timed_out_until is None:
             raise UserNotMuted(user)
 
-        await user.timeout(None, reason=format_reason(interaction.user, reason))
+        await self.untimeout(user, format_reason(interaction.user, reason))
+        self.bot.notifications.enqueue(
+            user,
+            f"You have been unmuted in {interaction.guild.name}. Reason: `{reason}`",
+        )
 
         await interaction.edit_original_response(
             content=f"Unmuted {user.mention}.\nReason: `{reason}`"
         )
 
+    @command(
+        name="temprole",
+        description="Gives a user a role for a while",
+    )
+    @describe(
+        user="The user to give the role to",
+        role="The role to give",
+        reason="The reason for giving the role",
+        days="The days to give the role for",
+        hours="The hours to give the role for",
+        minutes="The minutes to give the role for",
+    )
+    @ratelimit(user=(5, 10), guild=(30, 60))
+    @checks.has_permissions(manage_roles=True)
+    @checks.bot_has_permissions(manage_roles=True)
+    async def temprole(
+        self,
+        interaction: Interaction,
+        user: Member,
+        role: Role,
+        reason: Range[str, 1, 256],
+        days: Range[int, 0, 3650] = 0,
+        hours: Range[int, 0, 24] = 0,
+        minutes: Range[int, 0, 60] = 0,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        if isinstance(interaction.user, User):
+            raise MissingGuildUserData
+
+        guild = interaction.guild
+
+        if role >= interaction.user.top_role and interaction.user.id != guild.owner_id:
+            raise FailedRoleHierarchy(role)
+
+        if role >= guild.me.top_role:
+            raise BotFailedRoleHierarchy(role)
+
+        duration = make_duration(days, hours, minutes, 0)
+
+        await interaction.response.defer(ephemeral=True)
+
+        await user.add_roles(role, reason=format_reason(interaction.user, reason))
+        self.bot.member_cache.invalidate((guild.id, user.id))
+        await self.bot.scheduler.schedule(
+            "remove_role",
+            guild.id,
+            user.id,
+            datetime.now(timezone.utc) + duration,
+            role=role.id,
+        )
+
+        await interaction.edit_original_response(
+            content=(
+                f"Gave {user.mention} {role.mention} for "
+                f"{format_timedelta(duration)}.\nReason: `{reason}`"
+            ),
+            allowed_mentions=AllowedMentions.none(),
+        )
+
+    bulk = Group(
+        name="bulk",
+        description="Commands for moderating many users at once",
+        default_permissions=Permissions(
+            moderate_members=True,
+        ),
+        guild_only=True,
+    )
+
+    @bulk.command(
+        name="mute",
+        description="Mutes many users at once",
+    )
+    @describe(
+        users="The mentions or IDs of the users to mute",
+        role="A role whose members to mute",
+        reason="The reason for the mute",
+        days="The days to mute for",
+        hours="The hours to mute for",
+        minutes="The minutes to mute for",
+        seconds="The seconds to mute for",
+    )
+    @ratelimit(user=(1, 30), guild=(2, 60))
+    @checks.has_permissions(moderate_members=True)
+    @checks.bot_has_permissions(moderate_members=True)
+    async def bulk_mute(
+        self,
+        interaction: Interaction,
+        reason: Range[str, 1, 256],
+        users: Optional[str] = None,
+        role: Optional[Role] = None,
+        days: Range[int, 0, 3650] = 0,
+        hours: Range[int, 0, 24] = 0,
+        minutes: Range[int, 0, 60] = 0,
+        seconds: Range[int, 0, 60] = 0,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        if isinstance(interaction.user, User):
+            raise MissingGuildUserData
+
+        duration = make_duration(days, hours, minutes, seconds)
+
+        await interaction.response.defer(ephemeral=True)
+
+        guild, invoker = interaction.guild, interaction.user
+        members, failures = await self.resolve_targets(guild, users, role)
+        targets = {member.id: member for member in members}
+
+        async def mute(user_id: int):
+            member = targets[user_id]
+            self.check_hierarchy(guild, invoker, member)
+            await self.timeout(member, duration, format_reason(invoker, reason))
+            self.bot.notifications.enqueue(
+                member,
+                (
+                    f"You have been muted in {guild.name} for "
+                    f"{format_timedelta(duration)}. Reason: `{reason}`"
+                ),
+            )
+
+        results = await self.fan_out(targets, mute)
+        await self.send_bulk_results(interaction, "Muted", failures + results)
+
+    @bulk.command(
+        name="unmute",
+        description="Unmutes many users at once",
+    )
+    @describe(
+        users="The mentions or IDs of the users to unmute",
+        role="A role whose members to unmute",
+        reason="The reason for the unmute",
+    )
+    @ratelimit(user=(1, 30), guild=(2, 60))
+    @checks.has_permissions(moderate_members=True)
+    @checks.bot_has_permissions(moderate_members=True)
+    async def bulk_unmute(
+        self,
+        interaction: Interaction,
+        reason: Range[str, 1, 256],
+        users: Optional[str] = None,
+        role: Optional[Role] = None,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        if isinstance(interaction.user, User):
+            raise MissingGuildUserData
+
+        await interaction.response.defer(ephemeral=True)
+
+        guild, invoker = interaction.guild, interaction.user
+        members, failures = await self.resolve_targets(guild, users, role)
+        targets = {member.id: member for member in members}
+
+        async def unmute(user_id: int):
+            member = targets[user_id]
+            self.check_hierarchy(guild, invoker, member)
+
+            if member.timed_out_until is None:
+                raise UserNotMuted(member)
+
+            await self.untimeout(member, format_reason(invoker, reason))
+            self.bot.notifications.enqueue(
+                member,
+                f"You have been unmuted in {guild.name}. Reason: `{reason}`",
+            )
+
+        results = await self.fan_out(targets, unmute)
+        await self.send_bulk_results(interaction, "Unmuted", failures + results)
+
+    @bulk.command(
+        name="warn",
+        description="Warns many users at once",
+    )
+    @describe(
+        users="The mentions or IDs of the users to warn",
+        role="A role whose members to warn",
+        reason="The reason for the warn",
+    )
+    @ratelimit(user=(1, 30), guild=(2, 60))
+    @checks.has_permissions(manage_messages=True)
+    async def bulk_warn(
+        self,
+        interaction: Interaction,
+        reason: Range[str, 1, 256],
+        users: Optional[str] = None,
+        role: Optional[Role] = None,
+    ):
+        if not interaction.guild:
+            raise NoPrivateMessage
+
+        if isinstance(interaction.user, User):
+            raise MissingGuildUserData
+
+        await interaction.response.defer(ephemeral=True)
+
+        guild, invoker = interaction.guild, interaction.user
+        members, failures = await self.resolve_targets(guild, users, role)
+        candidates = {member.id: member for member in members}
+
+        async def check(user_id: int):
+            self.check_hierarchy(guild, invoker, candidates[user_id])
+
+        # Checked before the warns are added, so members that can't be warned
+        # are reported as failures rather than warned, notified and escalated.
+        checked = await self.fan_out(candidates, check)
+        failures += [result for result in checked if result[1] is not None]
+        targets = {
+            user_id: candidates[user_id] for user_id, error in checked if error is None
+        }
+
+        if targets:
+            expires = self.warn_expiry(guild.id, None)
+            await self.bot.warns.add_many(
+                [
+                    Warn(
+                        guild=guild.id,
+                        user=user_id,
+                        reason=reason,
+                        moderator=interaction.user.id,
+                        warn_id=generate_code(16),
+                        expires=expires,
+                    )
+                    for user_id in targets
+                ]
+            )
+
+        async def notify_and_escalate(user_id: int):
+            member = targets[user_id]
+
+            self.bot.notifications.enqueue(
+                member,
+                f"You have been warned in {guild.name}. Reason: `{reason}`",
+            )
+
+            if interaction.permissions.moderate_members:
+                await self.escalate(guild, member)
+
+        results = await self.fan_out(targets, notify_and_escalate)
+        await self.send_bulk_results(
+            interaction,
+            "Warned",
+            failures + results,
+            note=self.escalation_skipped(interaction),
+        )
+
 
 async def setup(bot: Bot):
     await bot.add_cog(Moderation(bot))
@@ -1,57 +1,199 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from collections import defaultdict
+from typing import TYPE_CHECKING, DefaultDict, Dict, List, Optional, Type
 
-from discord import Interaction
-from discord.app_commands import Group, Range, describe
+from discord import AllowedMentions, Interaction
+from discord.app_commands import Choice, Group, NoPrivateMessage, Range, describe
 from discord.ext.commands import Cog
 
+from bot.storage import Tag
+
 from .utils import (
     TagExists,
     TagNotFound,
     MissingPermissionsForTagDeletion,
     MissingPermissionsForTagEdit,
+    TrigramIndex,
+    Trie,
+    ratelimit,
 )
 
-
 if TYPE_CHECKING:
     from ..bot import Bot
+    from bot.errors import Template
+
+
+TOP_TAGS = 10
+
+
+def format_tag_not_found(error: TagNotFound) -> str:
+    if not error.suggestions:
+        return "This tag does not exist."
+
+    suggestions = ", ".join(f"`{name}`" for name in error.suggestions)
+    return f"This tag does not exist. Did you mean {suggestions}?"
+
+
+ERROR_RESPONSES: Dict[Type[Exception], Template] = {
+    TagNotFound: format_tag_not_found,
+    TagExists: "This tag already exists.",
+    MissingPermissionsForTagDeletion: "You are missing permissions to delete this tag.",
+    MissingPermissionsForTagEdit: "You are missing permissions to edit this tag.",
+}
 
 
 class Tags(Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.tag_names: DefaultDict[int, Trie] = defaultdict(Trie)
+        self.tag_grams: DefaultDict[int, TrigramIndex] = defaultdict(TrigramIndex)
+        # Any worker serving interactions over HTTP may get any guild's
+        # interactions, so none can keep its own index up to date. They
+        # query the database instead and don't suggest similar names.
+        self.indexed = not self.bot.config.get("http_interactions", False)
+
+    async def cog_load(self) -> None:
+        for error, template in ERROR_RESPONSES.items():
+            self.bot.tree.errors.register(error, template)
+
+        if not self.indexed:
+            return
+
+        # Only this process's guilds, when the bot is spread across processes.
+        async for guild_id, name in self.bot.tags.names():
+            if self.bot.owns_guild(guild_id):
+                self.index_tag(guild_id, name)
+
+    async def cog_unload(self) -> None:
+        for error in ERROR_RESPONSES:
+            self.bot.tree.errors.unregister(error)
+
+    def index_tag(self, guild_id: int, name: str) -> None:
+        """Adds a tag name to the guild's autocomplete and fuzzy indexes"""
+        if not self.indexed:
+            return
+
+        self.tag_names[guild_id].insert(name)
+        self.tag_grams[guild_id].add(name)
+
+    def unindex_tag(self, guild_id: int, name: str) -> None:
+        """Removes a tag name from the guild's autocomplete and fuzzy indexes"""
+        if not self.indexed:
+            return
+
+        self.tag_names[guild_id].remove(name)
+        self.tag_grams[guild_id].remove(name)
+
+    def forget_tag(self, tag: Tag) -> None:
+        """Drops a tag that no longer exists from the cache, the indexes and
+        the pending use counts"""
+        self.bot.tag_cache.invalidate((tag["guild"], tag["_name"]))
+        self.bot.tag_uses.discard(tag["guild"], tag["_name"])
+        self.unindex_tag(tag["guild"], tag["name"])
+
+    def tag_not_found(self, guild_id: int, name: str) -> TagNotFound:
+        """Builds a TagNotFound suggesting the closest existing tag names"""
+        if guild_id not in self.tag_grams:
+            return TagNotFound()
+
+        return TagNotFound(self.tag_grams[guild_id].search(name))
 
     tags = Group(name="tags", description="Commands for managing tags", guild_only=True)
 
+    async def get_tag(self, guild_id: int, name: str) -> Optional[Tag]:
+        """Gets a tag by name, consulting the tag cache before the database"""
+        key = (guild_id, name.lower())
+        tag = self.bot.tag_cache.get(key)
+
+        if tag is None:
+            tag = await self.bot.tags.get(guild_id, name)
+
+            if tag:
+                self.bot.tag_cache.set(key, tag)
+
+        return tag
+
+    @tags.command(name="show", description="Shows a tag")
+    @describe(
+        name="The name of the tag",
+    )
+    @ratelimit(user=(5, 10), guild=(60, 60))
+    async def show_tag(
+        self,
+        interaction: Interaction,
+        name: Range[str, 1, 32],
+    ):
+        if not interaction.guild_id:
+            raise NoPrivateMessage
+
+        tag = await self.get_tag(interaction.guild_id, name)
+
+        if not tag:
+            raise self.tag_not_found(interaction.guild_id, name)
+
+        # Counted in memory and written in batches, so showing a tag served
+        # from the cache still costs no database write.
+        self.bot.tag_uses.record(tag["guild"], tag["_name"])
+
+        await interaction.response.send_message(
+            tag["content"],
+            allowed_mentions=AllowedMentions.none(),
+        )
+
+    @tags.command(name="top", description="Lists the most used tags")
+    @ratelimit(user=(2, 10), guild=(10, 60))
+    async def top_tags(self, interaction: Interaction):
+        if not interaction.guild_id:
+            raise NoPrivateMessage
+
+        top = await self.bot.tags.top(interaction.guild_id, limit=TOP_TAGS)
+
+        if not top:
+            return await interaction.response.send_message(
+                "No tags have been used yet.",
+                ephemeral=True,
+            )
+
+        await interaction.response.send_message(
+            "\n".join(
+                ["Most used tags"]
+                + [
+                    f"{rank}. `{name}` - {uses} uses"
+                    for rank, (name, uses) in enumerate(top, 1)
+                ]
+            ),
+            ephemeral=True,
+        )
+
     @tags.command(name="create", description="Creates a tag")
     @describe(
         name="The name of the tag",
         content="The content of the tag",
     )
+    @ratelimit(user=(2, 10), guild=(20, 60))
     async def create_tag(
         self,
         interaction: Interaction,
         name: Range[str, 1, 32],
         content: Range[str, 1, 2000],
     ):
-        existing_tag = await self.bot.tags.find_one(
-            {
-                "_name": name.lower(),
-            }
+        if not interaction.guild_id:
+            raise NoPrivateMessage
+
+        tag = Tag(
+            guild=interaction.guild_id,
+            name=name,
+            _name=name.lower(),
+            content=content,
+            author=interaction.user.id,
         )
 
-        if existing_tag:
+        if not await self.bot.tags.create(tag):
             raise TagExists
 
-        await self.bot.tags.insert_one(
-            {
-                "name": name,
-                "_name": name.lower(),
-                "content": content,
-                "author": interaction.user.id,
-            }
-        )
+        self.bot.tag_cache.set((tag["guild"], tag["_name"]), tag)
+        self.index_tag(tag["guild"], name)
 
         await interaction.response.send_message(
             f"Successfully created tag `{name}`",
@@ -62,19 +204,19 @@ class Tags(Cog):
     @describe(
         name="The name of the tag",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     async def delete_tag(
         self,
         interaction: Interaction,
         name: Range[str, 1, 32],
     ):
-        tag = await self.bot.tags.find_one(
-            {
-                "_name": name.lower(),
-            }
-        )
+        if not interaction.guild_id:
+            raise NoPrivateMessage
+
+        tag = await self.get_tag(interaction.guild_id, name)
 
         if not tag:
-            raise TagNotFound
+            raise self.tag_not_found(interaction.guild_id, name)
 
         if (
             tag["author"] != interaction.user.id
@@ -82,7 +224,12 @@ class Tags(Cog):
         ):
             raise MissingPermissionsForTagDeletion
 
-        await self.bot.tags.delete_one(tag)
+        deleted = await self.bot.tags.delete(tag["guild"], tag["_name"])
+        self.forget_tag(tag)
+
+        # The cached tag was already deleted, e.g. by another process.
+        if not deleted:
+            raise self.tag_not_found(interaction.guild_id, name)
 
         await interaction.response.send_message(
             f"Successfully deleted tag `{name}`",
@@ -94,20 +241,20 @@ class Tags(Cog):
         name="The name of the tag",
         content="The new content of the tag",
     )
+    @ratelimit(user=(5, 10), guild=(30, 60))
     async def edit_tag(
         self,
         interaction: Interaction,
         name: Range[str, 1, 32],
         content: Range[str, 1, 2000],
     ):
-        tag = await self.bot.tags.find_one(
-            {
-                "_name": name.lower(),
-            }
-        )
+        if not interaction.guild_id:
+            raise NoPrivateMessage
+
+        tag = await self.get_tag(interaction.guild_id, name)
 
         if not tag:
-            raise TagNotFound
+            raise self.tag_not_found(interaction.guild_id, name)
 
         if (
             tag["author"] != interaction.user.id
@@ -115,13 +262,13 @@ class Tags(Cog):
         ):
             raise MissingPermissionsForTagEdit
 
-        await self.bot.tags.update_one(
-            tag,
-            {
-                "$set": {
-                    "content": content,
-                }
-            },
+        if not await self.bot.tags.update_content(tag["guild"], tag["_name"], content):
+            self.forget_tag(tag)
+            raise self.tag_not_found(interaction.guild_id, name)
+
+        self.bot.tag_cache.set(
+            (tag["guild"], tag["_name"]),
+            {**tag, "content": content},
         )
 
         await interaction.response.send_message(
@@ -132,6 +279,32 @@ class Tags(Cog):
         # TODO: Maybe an audit log?
         # TODO: Should add aliases?
 
+    @show_tag.autocomplete("name")
+    @create_tag.autocomplete("name")
+    @delete_tag.autocomplete("name")
+    @edit_tag.autocomplete("name")
+    async def tag_name_autocomplete(
+        self,
+        interaction: Interaction,
+        current: str,
+    ) -> List[Choice[str]]:
+        if not interaction.guild_id:
+            return []
+
+        if not self.indexed:
+            names = await self.bot.tags.starting_with(
+                interaction.guild_id, current, limit=25
+            )
+            return [Choice(name=name, value=name) for name in names]
+
+        if interaction.guild_id not in self.tag_names:
+            return []
+
+        return [
+            Choice(name=name, value=name)
+            for name in self.tag_names[interaction.guild_id].starts_with(current)
+        ]
+
 
 async def setup(bot: Bot):
     await bot.add_cog(Tags(bot))
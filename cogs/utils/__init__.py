@@ -6,6 +6,8 @@ from .exceptions import (
     WarnNotFound,
     FailedHierarchy,
     BotFailedHierarchy,
+    FailedRoleHierarchy,
+    BotFailedRoleHierarchy,
     MissingGuildUserData,
     CannotPerformActionOnSelf,
     CannotPerformActionOnMe,
@@ -13,9 +15,16 @@ from .exceptions import (
     CannotPerformActionOnOwner,
     DurationTooLong,
     InvalidDuration,
+    TooManyTargets,
     UserNotMuted,
+    NotOwner,
 )
-from .misc import Confirm, generate_code, format_timedelta, format_reason
+from .cache import TTLCache
+from .ratelimit import RateLimiter, ratelimit
+from .fuzzy import TrigramIndex
+from .trie import Trie
+from .paginator import KeysetPaginator
+from .misc import Confirm, generate_code, format_timedelta, format_reason, is_owner
 
 __all__ = (
     "TagNotFound",
@@ -25,6 +34,8 @@ __all__ = (
     "WarnNotFound",
     "FailedHierarchy",
     "BotFailedHierarchy",
+    "FailedRoleHierarchy",
+    "BotFailedRoleHierarchy",
     "MissingGuildUserData",
     "CannotPerformActionOnSelf",
     "CannotPerformActionOnMe",
@@ -32,9 +43,18 @@ __all__ = (
     "CannotPerformActionOnOwner",
     "DurationTooLong",
     "InvalidDuration",
+    "TooManyTargets",
     "Confirm",
     "UserNotMuted",
     "generate_code",
     "format_timedelta",
     "format_reason",
+    "TTLCache",
+    "RateLimiter",
+    "ratelimit",
+    "NotOwner",
+    "is_owner",
+    "Trie",
+    "TrigramIndex",
+    "KeysetPaginator",
 )
@@ -1,10 +1,15 @@
-from discord import Member
+from typing import Sequence
+
+from discord import Member, Role
 from discord.app_commands import AppCommandError
 
 
 class TagNotFound(AppCommandError):
     """Raised when a tag is not found"""
 
+    def __init__(self, suggestions: Sequence[str] = ()):
+        self.suggestions = suggestions
+
 
 class TagExists(AppCommandError):
     """Raised when a tag already exists"""
@@ -48,6 +53,21 @@ class BotFailedHierarchy(BaseFailedHierarchy):
     """Raised when the bot is missing permissions to perform an action on a user"""
 
 
+class BaseFailedRoleHierarchy(AppCommandError):
+    """Base exception for role hierarchy errors"""
+
+    def __init__(self, role: Role):
+        self.role = role
+
+
+class FailedRoleHierarchy(BaseFailedRoleHierarchy):
+    """Raised when a user is missing permissions to give or take a role"""
+
+
+class BotFailedRoleHierarchy(BaseFailedRoleHierarchy):
+    """Raised when the bot is missing permissions to give or take a role"""
+
+
 class MissingGuildUserData(AppCommandError):
     """Raised when we receive an instance of User instead of Member"""
 
@@ -83,8 +103,20 @@ class DurationTooLong(BaseDurationError):
     """Raised when a duration is too long"""
 
 
+class TooManyTargets(AppCommandError):
+    """Raised when a bulk action names more users than it may act on"""
+
+    def __init__(self, count: int, limit: int):
+        self.count = count
+        self.limit = limit
+
+
 class UserNotMuted(AppCommandError):
     """Raised when a user is not muted"""
 
     def __init__(self, member: Member):
         self.member = member
+
+
+class NotOwner(AppCommandError):
+    """Raised when a user who doesn't own the bot runs an owner-only command"""
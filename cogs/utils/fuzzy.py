@@ -0,0 +1,84 @@
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Splits text into its lowercase trigrams, padded so short words and
+    word starts still produce grams."""
+    padded = f"  {text.lower()} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """An inverted index from trigrams to names, for fuzzy lookups.
+
+    A search only visits the names that share at least one trigram with
+    the query, rather than comparing the query against every name."""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._names: Dict[str, Tuple[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str) -> None:
+        """Adds a name, keyed on its lowercase form"""
+        key = name.lower()
+
+        if key in self._names:
+            self._names[key] = (name, self._names[key][1])
+            return
+
+        grams = trigrams(key)
+        self._names[key] = (name, len(grams))
+
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, name: str) -> None:
+        """Removes a name from the index"""
+        key = name.lower()
+
+        if self._names.pop(key, None) is None:
+            return
+
+        for gram in trigrams(key):
+            postings = self._postings.get(gram)
+
+            if postings is None:
+                continue
+
+            postings.discard(key)
+
+            if not postings:
+                del self._postings[gram]
+
+    def search(
+        self,
+        query: str,
+        *,
+        limit: int = 3,
+        threshold: float = 0.3,
+    ) -> List[str]:
+        """Returns up to ``limit`` names most similar to ``query``.
+
+        Similarity is the Sørensen-Dice coefficient of the trigram sets,
+        and names scoring below ``threshold`` are left out."""
+        grams = trigrams(query)
+        shared: Counter = Counter()
+
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = (
+            (2 * count / (len(grams) + self._names[key][1]), key)
+            for key, count in shared.items()
+        )
+
+        return [
+            self._names[key][0]
+            for score, key in nlargest(limit, scored)
+            if score >= threshold
+        ]
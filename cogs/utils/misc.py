@@ -3,8 +3,11 @@ from random import sample
 from string import ascii_letters, digits
 
 from discord import ButtonStyle, Interaction, Member
+from discord.app_commands import check
 from discord.ui import View, button
 
+from .exceptions import NotOwner
+
 
 def generate_code(length: int) -> str:
     """Generate a random code with the given length."""
@@ -38,6 +41,18 @@ def format_timedelta(delta: timedelta) -> str:
     )
 
 
+def is_owner():
+    """A check that only lets the owner of the bot run a command."""
+
+    async def predicate(interaction: Interaction) -> bool:
+        if not await interaction.client.is_owner(interaction.user):  # type: ignore
+            raise NotOwner
+
+        return True
+
+    return check(predicate)
+
+
 class Confirm(View):
     def __init__(self):
         super().__init__(timeout=None)
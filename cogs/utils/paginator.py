@@ -0,0 +1,67 @@
+from typing import Any, Awaitable, Callable, List, Optional
+
+from discord import ButtonStyle, Interaction
+from discord.ui import View, button
+
+Fetch = Callable[[Optional[Any], int], Awaitable[List[dict]]]
+Format = Callable[[List[dict], int], str]
+
+
+class KeysetPaginator(View):
+    """A view that pages through documents with keyset pagination.
+
+    ``fetch`` is called with the key of the last document on the previous
+    page (or None for the first page) and a limit, and should return the
+    documents after that key in key order. Only the start key of each
+    visited page is kept, so going back never re-reads earlier pages."""
+
+    def __init__(
+        self,
+        fetch: Fetch,
+        formatter: Format,
+        *,
+        author_id: int,
+        page_size: int = 10,
+        key: str = "_id",
+    ):
+        super().__init__(timeout=180)
+        self.fetch = fetch
+        self.formatter = formatter
+        self.author_id = author_id
+        self.page_size = page_size
+        self.key = key
+
+        self.starts: List[Optional[Any]] = [None]
+        self.page: List[dict] = []
+        self.has_next = False
+
+    @property
+    def page_number(self) -> int:
+        return len(self.starts)
+
+    async def load(self) -> str:
+        """Loads the current page and returns its content"""
+        documents = await self.fetch(self.starts[-1], self.page_size + 1)
+
+        self.has_next = len(documents) > self.page_size
+        self.page = documents[: self.page_size]
+
+        self.previous.disabled = len(self.starts) == 1
+        self.next.disabled = not self.has_next
+
+        return self.formatter(self.page, self.page_number)
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    @button(label="Previous", style=ButtonStyle.grey)
+    async def previous(self, interaction: Interaction, _):
+        self.starts.pop()
+        content = await self.load()
+        await interaction.response.edit_message(content=content, view=self)
+
+    @button(label="Next", style=ButtonStyle.grey)
+    async def next(self, interaction: Interaction, _):
+        self.starts.append(self.page[-1][self.key])
+        content = await self.load()
+        await interaction.response.edit_message(content=content, view=self)
@@ -0,0 +1,167 @@
+from time import monotonic
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from discord import Interaction
+from discord.app_commands import CommandOnCooldown, Cooldown, check
+
+# A rate given as [uses, per seconds], or None for no limit.
+Rate = Optional[Sequence[float]]
+
+SCOPES = ("user", "guild", "global")
+
+
+class RateLimit:
+    """Token buckets sharing a rate, one per key.
+
+    Each bucket is stored as the single time at which it will be full again
+    (the generic cell rate algorithm), rather than as a token count and the
+    time it was last updated. A bucket that is full again is the same as no
+    bucket at all, so ``evict`` can drop it."""
+
+    __slots__ = ("rate", "per", "interval", "tolerance", "_full_at")
+
+    def __init__(self, rate: float, per: float):
+        self.rate = rate
+        self.per = per
+        self.interval = per / rate
+        self.tolerance = per - self.interval
+        self._full_at: Dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def peek(self, key: Hashable, now: float) -> Tuple[float, float]:
+        """Gets when the bucket would be full after taking a token, and how
+        long until a token can be taken, which is 0 if one can be now"""
+        full_at = max(self._full_at.get(key, now), now)
+        return full_at + self.interval, max(full_at - now - self.tolerance, 0.0)
+
+    def take(self, key: Hashable, full_at: float) -> None:
+        self._full_at[key] = full_at
+
+    def evict(self, now: float) -> int:
+        """Drops every full bucket, returning how many were dropped"""
+        idle = [key for key, full_at in self._full_at.items() if full_at <= now]
+
+        for key in idle:
+            del self._full_at[key]
+
+        return len(idle)
+
+
+class RateLimiter:
+    """Rate limits commands per user, per guild and globally.
+
+    The rates in the config, keyed on the qualified name of a command and
+    then on the scope, override the defaults given to ``ratelimit``:
+    ``{"tags create": {"user": [2, 10], "global": null}}``. Idle buckets are
+    evicted every ``sweep_interval`` seconds, so memory use follows the
+    number of users that have used a command recently.
+
+    When ``workers`` processes share the load without sharing buckets, as
+    when interactions are served over HTTP behind a load balancer, each gets
+    an even share of every rate, so the limits hold across all of them as
+    long as the load is spread evenly."""
+
+    def __init__(
+        self,
+        config: Dict[str, Dict[str, Rate]],
+        *,
+        enabled: bool = True,
+        workers: int = 1,
+        sweep_interval: float = 60.0,
+    ):
+        self.config = config
+        self.enabled = enabled
+        self.workers = workers
+        self.sweep_interval = sweep_interval
+        self.limits: Dict[Tuple[str, str], Optional[RateLimit]] = {}
+        self._next_sweep = monotonic() + sweep_interval
+
+        self.rejected = 0
+        self.evictions = 0
+
+    def limit(self, command: str, scope: str, default: Rate) -> Optional[RateLimit]:
+        if (command, scope) not in self.limits:
+            rate = self.config.get(command, {}).get(scope, default)
+            self.limits[command, scope] = self.share(*rate) if rate else None
+
+        return self.limits[command, scope]
+
+    def share(self, uses: float, per: float) -> RateLimit:
+        """This process's share of a rate. Bursts are split between the
+        workers, down to one use each, and the period is stretched so that
+        together they sustain the full rate"""
+        burst = max(uses // self.workers, 1)
+        return RateLimit(burst, per * burst * self.workers / uses)
+
+    def hit(
+        self,
+        command: str,
+        keys: Dict[str, Hashable],
+        defaults: Dict[str, Rate],
+    ) -> None:
+        """Takes a token from the command's bucket in every scope, raising
+        CommandOnCooldown without taking any if one of them is empty"""
+        if not self.enabled:
+            return
+
+        now = monotonic()
+
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        taken: List[Tuple[RateLimit, Hashable, float]] = []
+
+        for scope in SCOPES:
+            limit = self.limit(command, scope, defaults.get(scope))
+
+            if limit is None:
+                continue
+
+            full_at, retry_after = limit.peek(keys[scope], now)
+
+            if retry_after:
+                self.rejected += 1
+                raise CommandOnCooldown(Cooldown(limit.rate, limit.per), retry_after)
+
+            taken.append((limit, keys[scope], full_at))
+
+        for limit, key, full_at in taken:
+            limit.take(key, full_at)
+
+    def sweep(self, now: float) -> None:
+        for limit in self.limits.values():
+            if limit is not None:
+                self.evictions += limit.evict(now)
+
+        self._next_sweep = now + self.sweep_interval
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buckets": sum(len(limit) for limit in self.limits.values() if limit),
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+def ratelimit(*, user: Rate = None, guild: Rate = None, global_: Rate = None):
+    """A check that rate limits a command before it does any work.
+
+    Each rate is given as ``(uses, per seconds)``. In direct messages the
+    guild scope falls back to the user."""
+    defaults = {"user": user, "guild": guild, "global": global_}
+
+    async def predicate(interaction: Interaction) -> bool:
+        command = interaction.command
+        keys = {
+            "user": interaction.user.id,
+            "guild": interaction.guild_id or interaction.user.id,
+            "global": None,
+        }
+        interaction.client.ratelimits.hit(  # type: ignore
+            command.qualified_name if command else "", keys, defaults
+        )
+        return True
+
+    return check(predicate)
@@ -0,0 +1,102 @@
+from typing import Dict, Iterator, List, Optional
+
+
+class _Node:
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.value: Optional[str] = None
+
+
+class Trie:
+    """A case-insensitive prefix tree mapping keys to display names."""
+
+    def __init__(self):
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        node = self._find(key.lower())
+        return node is not None and node.value is not None
+
+    def _find(self, key: str) -> Optional[_Node]:
+        node = self._root
+
+        for char in key:
+            node = node.children.get(char)
+
+            if node is None:
+                return None
+
+        return node
+
+    def insert(self, name: str) -> None:
+        """Adds a name, keyed on its lowercase form"""
+        node = self._root
+
+        for char in name.lower():
+            node = node.children.setdefault(char, _Node())
+
+        if node.value is None:
+            self._size += 1
+
+        node.value = name
+
+    def remove(self, name: str) -> None:
+        """Removes a name, pruning any branches left empty"""
+        key = name.lower()
+        path = [self._root]
+
+        for char in key:
+            node = path[-1].children.get(char)
+
+            if node is None:
+                return
+
+            path.append(node)
+
+        if path[-1].value is None:
+            return
+
+        path[-1].value = None
+        self._size -= 1
+
+        for depth in range(len(key), 0, -1):
+            if path[depth].children or path[depth].value is not None:
+                break
+
+            del path[depth - 1].children[key[depth - 1]]
+
+    def _walk(self, node: _Node) -> Iterator[str]:
+        stack = [node]
+
+        while stack:
+            node = stack.pop()
+
+            if node.value is not None:
+                yield node.value
+
+            stack.extend(
+                node.children[char] for char in sorted(node.children, reverse=True)
+            )
+
+    def starts_with(self, prefix: str, *, limit: int = 25) -> List[str]:
+        """Returns up to ``limit`` names starting with ``prefix``, in order"""
+        node = self._find(prefix.lower())
+
+        if node is None:
+            return []
+
+        names = []
+
+        for name in self._walk(node):
+            names.append(name)
+
+            if len(names) >= limit:
+                break
+
+        return names
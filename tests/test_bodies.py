@@ -0,0 +1,39 @@
+import hashlib
+import zlib
+
+from bot.storage.bodies import (
+    COMPRESS_LEVEL,
+    COMPRESS_THRESHOLD,
+    Body,
+    decode_body,
+    encode_body,
+)
+
+
+def test_bodies_up_to_the_threshold_are_stored_raw():
+    content = "a" * COMPRESS_THRESHOLD
+    raw = content.encode()
+
+    assert encode_body(content) == Body(hashlib.sha256(raw).hexdigest(), raw, False)
+
+
+def test_bodies_above_the_threshold_are_compressed():
+    content = "a" * (COMPRESS_THRESHOLD + 1)
+    body = encode_body(content)
+
+    assert body.compressed
+    assert body.data == zlib.compress(content.encode(), COMPRESS_LEVEL)
+    assert decode_body(body.data, body.compressed) == content
+
+
+def test_the_hash_is_of_the_content_not_the_stored_data():
+    content = "a" * 1000
+
+    assert encode_body(content).hash == hashlib.sha256(content.encode()).hexdigest()
+
+
+def test_non_ascii_content_round_trips():
+    for content in ("ünïcödé 🏷️", "ünïcödé 🏷️ " * 100):
+        body = encode_body(content)
+
+        assert decode_body(body.data, body.compressed) == content
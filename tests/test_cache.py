@@ -0,0 +1,73 @@
+from cogs.utils import cache
+from cogs.utils.cache import TTLCache
+
+
+def test_hits_and_misses_are_counted():
+    tags: TTLCache[str] = TTLCache(maxsize=2, ttl=10)
+    tags.set((1, "faq"), "Read it")
+
+    assert tags.get((1, "faq")) == "Read it"
+    assert tags.get((2, "faq")) is None
+    assert tags.stats() == {
+        "size": 1,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "hit_rate": 0.5,
+    }
+
+
+def test_entries_expire_after_their_ttl(monkeypatch, clock):
+    monkeypatch.setattr(cache, "monotonic", clock)
+    tags: TTLCache[str] = TTLCache(maxsize=2, ttl=10)
+    tags.set("faq", "Read it")
+
+    clock.advance(9.9)
+    assert tags.get("faq") == "Read it"
+
+    clock.advance(0.1)
+    assert tags.get("faq") is None
+    assert len(tags) == 0
+    assert tags.evictions == 1
+
+    # Setting a value again starts its ttl over.
+    tags.set("faq", "Read it")
+    clock.advance(8)
+    tags.set("faq", "Read it again")
+    clock.advance(8)
+    assert tags.get("faq") == "Read it again"
+
+
+def test_the_least_recently_used_entry_is_evicted():
+    tags: TTLCache[int] = TTLCache(maxsize=2, ttl=10)
+    tags.set("a", 1)
+    tags.set("b", 2)
+    tags.get("a")
+    tags.set("c", 3)
+
+    assert "b" not in tags
+    assert "a" in tags and "c" in tags
+    assert tags.evictions == 1
+
+
+def test_a_maxsize_of_0_turns_the_cache_off():
+    tags: TTLCache[int] = TTLCache(maxsize=0)
+    tags.set("a", 1)
+
+    assert len(tags) == 0
+    assert tags.get("a") is None
+
+
+def test_invalidate_and_clear():
+    tags: TTLCache[int] = TTLCache()
+    tags.set("a", 1)
+    tags.set("b", 2)
+
+    tags.invalidate("a")
+    tags.invalidate("missing")
+    assert "a" not in tags
+    assert len(tags) == 1
+
+    tags.clear()
+    assert len(tags) == 0
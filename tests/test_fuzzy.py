@@ -0,0 +1,42 @@
+from cogs.utils.fuzzy import TrigramIndex, trigrams
+
+
+def test_trigrams():
+    assert trigrams("Ab") == {"  a", " ab", "ab "}
+    assert trigrams("rule") == {"  r", " ru", "rul", "ule", "le "}
+
+
+def test_search_ranks_by_dice_coefficient():
+    index = TrigramIndex()
+
+    for name in ("Rules", "roles", "faq"):
+        index.add(name)
+
+    # "rule" shares 4 trigrams with "rules", scoring 2 * 4 / (5 + 6) = 0.73,
+    # and only "  r" with "roles", scoring 2 * 1 / (5 + 6) = 0.18.
+    assert index.search("rule") == ["Rules"]
+    assert index.search("rule", threshold=0.18) == ["Rules", "roles"]
+    assert index.search("rule", threshold=0.18, limit=1) == ["Rules"]
+    assert index.search("xyz") == []
+
+
+def test_add_keeps_the_latest_display_name():
+    index = TrigramIndex()
+    index.add("faq")
+    index.add("FAQ")
+
+    assert len(index) == 1
+    assert index.search("faq") == ["FAQ"]
+
+
+def test_remove_drops_the_name_from_every_posting():
+    index = TrigramIndex()
+    index.add("rules")
+    index.add("roles")
+
+    index.remove("Rules")
+    index.remove("missing")
+
+    assert len(index) == 1
+    assert index.search("rules", threshold=0) == ["roles"]
+    assert all(keys == {"roles"} for keys in index._postings.values())
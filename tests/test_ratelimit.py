@@ -0,0 +1,115 @@
+from importlib import import_module
+
+import pytest
+from discord.app_commands import CommandOnCooldown
+
+from cogs.utils.ratelimit import RateLimit, RateLimiter
+
+# cogs.utils re-exports the ratelimit decorator under the module's name.
+ratelimit = import_module("cogs.utils.ratelimit")
+
+
+def take(limit: RateLimit, key, now: float) -> float:
+    full_at, retry_after = limit.peek(key, now)
+
+    if not retry_after:
+        limit.take(key, full_at)
+
+    return retry_after
+
+
+def test_gcra_allows_burst_then_retry_after():
+    limit = RateLimit(2, 10)
+
+    assert take(limit, "a", 0) == 0
+    assert take(limit, "a", 0) == 0
+    assert take(limit, "a", 0) == pytest.approx(5)
+    assert take(limit, "a", 3) == pytest.approx(2)
+
+    # A token comes back every per / rate seconds.
+    assert take(limit, "a", 5) == 0
+    assert take(limit, "a", 5) == pytest.approx(5)
+
+
+def test_gcra_buckets_are_per_key():
+    limit = RateLimit(1, 10)
+
+    assert take(limit, "a", 0) == 0
+    assert take(limit, "b", 0) == 0
+    assert take(limit, "a", 0) == pytest.approx(10)
+
+
+def test_evict_drops_full_buckets():
+    limit = RateLimit(2, 10)
+    take(limit, "a", 0)
+    take(limit, "b", 4)
+
+    assert limit.evict(5) == 1
+    assert len(limit) == 1
+
+
+def test_hit_raises_with_retry_after(monkeypatch, clock):
+    monkeypatch.setattr(ratelimit, "monotonic", clock)
+    limiter = RateLimiter({})
+    defaults = {"user": (1, 10)}
+    keys = {"user": 1, "guild": 2, "global": None}
+
+    limiter.hit("tags create", keys, defaults)
+    clock.advance(4)
+
+    with pytest.raises(CommandOnCooldown) as error:
+        limiter.hit("tags create", keys, defaults)
+
+    assert error.value.retry_after == pytest.approx(6)
+    assert limiter.rejected == 1
+
+
+def test_hit_takes_nothing_when_any_scope_is_empty():
+    limiter = RateLimiter({})
+    defaults = {"user": (2, 10), "global": (1, 10)}
+
+    limiter.hit("cmd", {"user": 1, "guild": 1, "global": None}, defaults)
+
+    with pytest.raises(CommandOnCooldown):
+        limiter.hit("cmd", {"user": 2, "guild": 2, "global": None}, defaults)
+
+    # User 2's bucket was left untouched by the rejected hit.
+    assert len(limiter.limits["cmd", "user"]) == 1
+
+
+def test_config_overrides_and_disables_defaults():
+    limiter = RateLimiter({"cmd": {"user": None, "guild": [5, 10]}})
+
+    assert limiter.limit("cmd", "user", (1, 10)) is None
+    assert limiter.limit("cmd", "guild", (1, 10)).rate == 5
+
+
+def test_disabled_limiter_never_raises():
+    limiter = RateLimiter({}, enabled=False)
+    keys = {"user": 1, "guild": 1, "global": None}
+
+    for _ in range(10):
+        limiter.hit("cmd", keys, {"user": (1, 10)})
+
+
+def test_workers_share_the_rate():
+    limit = RateLimiter({}, workers=4).share(10, 60)
+
+    # Two uses each, refilled so that four workers sustain 10 per minute.
+    assert limit.rate == 2
+    assert limit.rate / limit.per * 4 == pytest.approx(10 / 60)
+
+    # A burst smaller than the number of workers still allows one use.
+    assert RateLimiter({}, workers=4).share(2, 60).rate == 1
+
+
+def test_sweep_evicts_idle_buckets(monkeypatch, clock):
+    monkeypatch.setattr(ratelimit, "monotonic", clock)
+    limiter = RateLimiter({}, sweep_interval=60)
+    keys = {"user": 1, "guild": 1, "global": None}
+    limiter.hit("cmd", keys, {"user": (1, 10)})
+
+    clock.advance(61)
+    limiter.hit("other", keys, {})
+
+    assert limiter.stats() == {"buckets": 0, "rejected": 0, "evictions": 1}
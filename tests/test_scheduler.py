@@ -0,0 +1,261 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Collection, List, Optional
+
+from bot import scheduler
+from bot.scheduler import Scheduler
+from bot.storage import Job
+from bot.storage.sqlite import SQLiteStorage
+
+
+class Process:
+    """Stands in for the bot, owning either every guild or only some"""
+
+    def __init__(self, guilds: Optional[Collection[int]] = None):
+        self.guilds = guilds
+
+    def owns_guild(self, guild_id: int) -> bool:
+        return self.guilds is None or guild_id in self.guilds
+
+
+def ago(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def pending(storage: SQLiteStorage) -> List[Job]:
+    return await storage.jobs.due_before(
+        datetime.max.replace(tzinfo=timezone.utc), kinds=["test"], limit=100
+    )
+
+
+def test_due_before_pages_in_due_order():
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+
+        for seconds in (5, 1, 3, 2, 4):
+            await storage.jobs.add(
+                Job(guild=1, user=seconds, kind="test", due=ago(seconds), data={})
+            )
+
+        await storage.jobs.add(Job(guild=1, user=0, kind="other", due=ago(6), data={}))
+
+        now = datetime.now(timezone.utc)
+        first = await storage.jobs.due_before(now, kinds=["test"], limit=3)
+        last = first[-1]
+        rest = await storage.jobs.due_before(
+            now, kinds=["test"], after=(last["due"], last["_id"]), limit=3
+        )
+
+        assert [job["user"] for job in first + rest] == [5, 4, 3, 2, 1]
+
+    asyncio.run(run())
+
+
+def test_runs_due_jobs_in_order_and_removes_them():
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+        jobs = Scheduler(Process(), storage.jobs)  # type: ignore
+        ran: List[int] = []
+
+        async def handler(job: Job):
+            ran.append(job["user"])
+
+        jobs.register("test", handler)
+
+        for seconds in (3, 1, 2):
+            await jobs.schedule("test", 1, seconds, ago(seconds))
+
+        jobs.start()
+        await wait_for(lambda: len(ran) == 3)
+        await wait_for(lambda: not jobs._running)
+        await jobs.stop()
+
+        assert ran == [3, 2, 1]
+        assert await pending(storage) == []
+
+    asyncio.run(run())
+
+
+def test_only_one_process_runs_a_job():
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+        ran: List[str] = []
+        processes = [Scheduler(Process(), storage.jobs) for _ in range(2)]
+
+        for name, jobs in zip("ab", processes):
+
+            async def handler(job: Job, name=name):
+                ran.append(name)
+
+            jobs.register("test", handler)
+
+        await storage.jobs.add(Job(guild=1, user=1, kind="test", due=ago(1), data={}))
+
+        for jobs in processes:
+            jobs.start()
+
+        await wait_for(lambda: ran)
+        await asyncio.sleep(0.1)
+
+        for jobs in processes:
+            await jobs.stop()
+
+        assert len(ran) == 1
+
+    asyncio.run(run())
+
+
+def test_claim_leases_a_job_until_the_lease_runs_out():
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+        job = await storage.jobs.add(
+            Job(guild=1, user=1, kind="test", due=ago(1), data={})
+        )
+        now = datetime.now(timezone.utc)
+        lease_until = now + timedelta(minutes=5)
+
+        assert await storage.jobs.claim(job["_id"], now, lease_until)
+        assert not await storage.jobs.claim(job["_id"], now, lease_until)
+
+        # The process holding the lease died, so the job is due again.
+        assert await storage.jobs.claim(job["_id"], lease_until, lease_until)
+
+    asyncio.run(run())
+
+
+def test_failed_jobs_are_retried(monkeypatch):
+    monkeypatch.setattr(scheduler, "RETRY_DELAY", 0.2)
+
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+        jobs = Scheduler(Process(), storage.jobs)  # type: ignore
+        attempts: List[int] = []
+
+        async def handler(job: Job):
+            attempts.append(job.get("attempts", 0))
+
+            if len(attempts) < 3:
+                raise RuntimeError("Discord is down")
+
+        jobs.register("test", handler)
+        await jobs.schedule("test", 1, 1, ago(1))
+        jobs.start()
+
+        await wait_for(lambda: len(attempts) == 1)
+        await wait_for(lambda: not jobs._running)
+        (job,) = await pending(storage)
+        assert job["attempts"] == 1
+        assert job["due"] > ago(0)
+
+        await wait_for(lambda: len(attempts) == 3)
+        await wait_for(lambda: not jobs._running)
+        await jobs.stop()
+
+        assert attempts == [0, 1, 2]
+        assert await pending(storage) == []
+
+    asyncio.run(run())
+
+
+def test_failing_jobs_are_dropped_after_the_last_attempt(monkeypatch):
+    monkeypatch.setattr(scheduler, "RETRY_DELAY", 0.01)
+    monkeypatch.setattr(scheduler, "MAX_ATTEMPTS", 3)
+
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+        jobs = Scheduler(Process(), storage.jobs)  # type: ignore
+        runs: List[int] = []
+
+        async def handler(job: Job):
+            runs.append(job.get("attempts", 0))
+            raise RuntimeError("Missing access")
+
+        jobs.register("test", handler)
+        await jobs.schedule("test", 1, 1, ago(1))
+        jobs.start()
+
+        await wait_for(lambda: len(runs) == 3)
+        await wait_for(lambda: not jobs._running)
+        await asyncio.sleep(0.05)
+        await jobs.stop()
+
+        assert runs == [0, 1, 2]
+        assert await pending(storage) == []
+
+    asyncio.run(run())
+
+
+def test_jobs_of_a_dead_process_run_once_the_lease_is_over(monkeypatch):
+    monkeypatch.setattr(scheduler, "LEASE", timedelta(seconds=0.1))
+
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+        job = await storage.jobs.add(
+            Job(guild=1, user=1, kind="test", due=ago(1), data={})
+        )
+        now = datetime.now(timezone.utc)
+        await storage.jobs.claim(job["_id"], now, now + scheduler.LEASE)
+
+        jobs = Scheduler(Process(), storage.jobs, horizon=1)  # type: ignore
+        ran: List[Job] = []
+
+        async def handler(job: Job):
+            ran.append(job)
+
+        jobs.register("test", handler)
+        jobs.start()
+
+        await wait_for(lambda: ran)
+        await wait_for(lambda: not jobs._running)
+        await jobs.stop()
+
+        assert await pending(storage) == []
+
+    asyncio.run(run())
+
+
+def test_pages_past_other_processes_jobs():
+    async def run():
+        storage = SQLiteStorage()
+        await storage.setup()
+
+        for user in range(50):
+            await storage.jobs.add(
+                Job(guild=2, user=user, kind="test", due=ago(10), data={})
+            )
+
+        for user in range(7):
+            await storage.jobs.add(
+                Job(guild=1, user=user, kind="test", due=ago(5), data={})
+            )
+
+        jobs = Scheduler(Process({1}), storage.jobs, batch_size=5)  # type: ignore
+        ran: List[int] = []
+
+        async def handler(job: Job):
+            ran.append(job["user"])
+
+        jobs.register("test", handler)
+        jobs.start()
+
+        await wait_for(lambda: len(ran) == 7)
+        await jobs.stop()
+
+        assert sorted(ran) == list(range(7))
+
+    asyncio.run(run())
@@ -0,0 +1,245 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from bson import ObjectId
+
+from bot.storage import Job, Tag, Warn
+from bot.storage.bodies import encode_body
+from bot.storage.sqlite import SQLiteStorage
+
+
+def run(test: Callable[[SQLiteStorage], Awaitable[None]]) -> None:
+    """Runs a test against a fresh in-memory database"""
+
+    async def main():
+        storage = SQLiteStorage()
+        await storage.setup()
+
+        try:
+            await test(storage)
+        finally:
+            await storage.close()
+
+    asyncio.run(main())
+
+
+def days_ago(days: float) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def warn(guild: int, user: int, warn_id: str, **extra) -> Warn:
+    return Warn(
+        guild=guild, user=user, reason="spam", moderator=1, warn_id=warn_id, **extra
+    )
+
+
+def test_tags_are_keyed_on_guild_and_lowercase_name():
+    async def test(storage: SQLiteStorage):
+        tags = storage.tags
+        faq = Tag(guild=1, name="FAQ", _name="faq", content="Read it", author=1)
+
+        assert await tags.create(faq)
+        assert not await tags.create({**faq, "name": "faq"})
+        assert await tags.create({**faq, "guild": 2})
+
+        assert await tags.get(1, "Faq") == faq
+        assert await tags.get(3, "faq") is None
+
+        assert await tags.update_content(1, "FAQ", "Read it again")
+        assert (await tags.get(1, "faq"))["content"] == "Read it again"
+        assert (await tags.get(2, "faq"))["content"] == "Read it"
+
+        assert await tags.delete(1, "faq")
+        assert await tags.get(1, "faq") is None
+        assert not await tags.delete(1, "faq")
+        assert not await tags.update_content(1, "faq", "Gone")
+
+    run(test)
+
+
+def test_tags_with_the_same_content_share_a_body():
+    async def test(storage: SQLiteStorage):
+        tags = storage.tags
+
+        def refs(content: str):
+            row = storage.connection.execute(
+                "SELECT refs FROM tag_bodies WHERE hash = ?",
+                (encode_body(content).hash,),
+            ).fetchone()
+            return row["refs"] if row else None
+
+        for guild, name in ((1, "a"), (1, "b"), (2, "a")):
+            await tags.create(
+                Tag(guild=guild, name=name, _name=name, content="shared", author=1)
+            )
+
+        assert refs("shared") == 3
+
+        # Losing the race for the name gives the reference back.
+        assert not await tags.create(
+            Tag(guild=1, name="A", _name="a", content="shared", author=1)
+        )
+        assert refs("shared") == 3
+
+        assert await tags.update_content(1, "a", "edited")
+        assert (refs("shared"), refs("edited")) == (2, 1)
+
+        await tags.delete(1, "b")
+        await tags.delete(2, "a")
+        assert refs("shared") is None
+
+        await tags.delete(1, "a")
+        assert refs("edited") is None
+
+    run(test)
+
+
+def test_tag_names_uses_and_prefixes():
+    async def test(storage: SQLiteStorage):
+        tags = storage.tags
+
+        for guild, name in ((1, "Rules"), (1, "roles"), (1, "faq"), (2, "rules")):
+            await tags.create(
+                Tag(guild=guild, name=name, _name=name.lower(), content=".", author=1)
+            )
+
+        assert await tags.starting_with(1, "R", limit=5) == ["roles", "Rules"]
+        assert await tags.starting_with(1, "ro", limit=5) == ["roles"]
+        assert await tags.starting_with(1, "", limit=1) == ["faq"]
+
+        await tags.add_uses({(1, "rules"): 3, (1, "faq"): 1, (2, "rules"): 9})
+        await tags.add_uses({(1, "faq"): 4, (1, "missing"): 1})
+        assert await tags.top(1, limit=5) == [("faq", 5), ("Rules", 3)]
+        assert await tags.top(1, limit=1) == [("faq", 5)]
+
+        names = [name async for name in tags.names()]
+        assert sorted(names) == [(1, "Rules"), (1, "faq"), (1, "roles"), (2, "rules")]
+
+    run(test)
+
+
+def test_warns_page_by_id():
+    async def test(storage: SQLiteStorage):
+        warns = storage.warns
+        added = [await warns.add(warn(1, 1, f"w{i}")) for i in range(5)]
+        await warns.add(warn(1, 2, "other user"))
+        await warns.add(warn(2, 1, "other guild"))
+
+        first = await warns.page(1, 1, limit=2)
+        second = await warns.page(1, 1, after=first[-1]["_id"], limit=2)
+        last = await warns.page(1, 1, after=second[-1]["_id"], limit=2)
+
+        assert [w["warn_id"] for w in first + second + last] == [
+            w["warn_id"] for w in added
+        ]
+        assert len(last) == 1
+        assert [w["warn_id"] async for w in warns.iterate(1, 1)] == [
+            w["warn_id"] for w in added
+        ]
+
+    run(test)
+
+
+def test_warns_are_removed_and_cleared_per_user():
+    async def test(storage: SQLiteStorage):
+        warns = storage.warns
+        await warns.add_many([warn(1, 1, "a"), warn(1, 1, "b"), warn(1, 2, "c")])
+
+        assert await warns.remove(1, 1, "a")
+        assert not await warns.remove(1, 1, "a")
+        assert not await warns.remove(2, 2, "c")
+
+        assert await warns.clear(1, 1) == 1
+        assert await warns.page(1, 1, limit=10) == []
+        assert len(await warns.page(1, 2, limit=10)) == 1
+
+    run(test)
+
+
+def test_count_since_and_stats():
+    async def test(storage: SQLiteStorage):
+        warns = storage.warns
+
+        # Warns are dated by their ObjectId, as in MongoDB.
+        await warns.add_many(
+            [
+                warn(1, 1, f"{days}d", _id=ObjectId.from_datetime(days_ago(days)))
+                for days in (10, 3, 2, 1, 0)
+            ]
+        )
+
+        since = days_ago(5)
+        assert await warns.count_since(1, 1, since) == 4
+        assert await warns.count_since(1, 1, since, limit=3) == 3
+        assert await warns.count_since(1, 2, since) == 0
+
+        stats = await warns.stats(1, 1, since)
+        assert stats is not None
+        assert (stats["total"], stats["recent"], stats["moderators"]) == (5, 4, 1)
+        assert stats["first"] < days_ago(9) < stats["last"]
+        assert await warns.stats(1, 2, since) is None
+
+    run(test)
+
+
+def test_expired_warns_are_hidden_then_pruned():
+    async def test(storage: SQLiteStorage):
+        warns = storage.warns
+        await warns.add_many(
+            [
+                warn(1, 1, "expired", expires=days_ago(1)),
+                warn(1, 1, "expired too", expires=days_ago(2)),
+                warn(1, 1, "expiring", expires=days_ago(-1)),
+                warn(1, 1, "kept"),
+            ]
+        )
+
+        page = await warns.page(1, 1, limit=10)
+        assert [w["warn_id"] for w in page] == ["expiring", "kept"]
+        assert await warns.count_since(1, 1, days_ago(1)) == 2
+        assert (await warns.stats(1, 1, days_ago(1)))["total"] == 2
+
+        assert await warns.prune_expired(days_ago(0), batch_size=1) == 2
+        (count,) = storage.connection.execute("SELECT COUNT(*) FROM warns").fetchone()
+        assert count == 2
+
+    run(test)
+
+
+def test_jobs_are_filtered_cancelled_and_retried():
+    async def test(storage: SQLiteStorage):
+        jobs = storage.jobs
+        now = datetime.now(timezone.utc)
+
+        timeout = await jobs.add(
+            Job(guild=1, user=1, kind="timeout", due=days_ago(1), data={"n": 1})
+        )
+        await jobs.add(Job(guild=1, user=1, kind="remove_role", due=now, data={}))
+        await jobs.add(Job(guild=1, user=2, kind="timeout", due=days_ago(-1), data={}))
+
+        (due,) = await jobs.due_before(now, kinds=["timeout"], limit=10)
+        assert due["_id"] == timeout["_id"]
+        assert due["data"] == {"n": 1}
+        assert due["attempts"] == 0
+
+        retry_at = now + timedelta(minutes=1)
+        await jobs.retry(timeout["_id"], retry_at)
+        assert await jobs.due_before(now, kinds=["timeout"], limit=10) == []
+
+        retried, _ = await jobs.due_before(
+            now + timedelta(days=2), kinds=["timeout"], limit=10
+        )
+        assert retried["attempts"] == 1
+        assert abs(retried["due"] - retry_at) < timedelta(milliseconds=1)
+
+        assert await jobs.cancel(1, 1, "timeout") == 1
+        assert await jobs.cancel(1, 1, "timeout") == 0
+
+        await jobs.complete(retried["_id"])
+        remaining = await jobs.due_before(
+            now + timedelta(days=2), kinds=["timeout", "remove_role"], limit=10
+        )
+        assert [job["kind"] for job in remaining] == ["remove_role", "timeout"]
+
+    run(test)
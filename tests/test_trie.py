@@ -0,0 +1,47 @@
+from cogs.utils.trie import Trie
+
+
+def test_starts_with():
+    trie = Trie()
+
+    for name in ("Rules", "faq", "roles", "Rolemenu", "r"):
+        trie.insert(name)
+
+    assert trie.starts_with("RO") == ["Rolemenu", "roles"]
+    assert trie.starts_with("") == ["faq", "r", "Rolemenu", "roles", "Rules"]
+    assert trie.starts_with("r", limit=2) == ["r", "Rolemenu"]
+    assert trie.starts_with("x") == []
+
+
+def test_insert_keeps_the_latest_display_name():
+    trie = Trie()
+    trie.insert("faq")
+    trie.insert("FAQ")
+
+    assert len(trie) == 1
+    assert "Faq" in trie
+    assert trie.starts_with("f") == ["FAQ"]
+
+
+def test_remove():
+    trie = Trie()
+
+    for name in ("ro", "role", "roles"):
+        trie.insert(name)
+
+    trie.remove("ROLE")
+    trie.remove("rol")
+    trie.remove("missing")
+
+    assert "role" not in trie
+    assert trie.starts_with("") == ["ro", "roles"]
+    assert len(trie) == 2
+
+
+def test_remove_prunes_empty_branches():
+    trie = Trie()
+    trie.insert("abc")
+    trie.remove("abc")
+
+    assert len(trie) == 0
+    assert trie._root.children == {}
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp.test_utils import TestClient, TestServer
+from discord.http import MultipartParameters
+from discord.webhook.async_ import async_context
+from nacl.signing import SigningKey
+
+from bot import webhook
+from bot.webhook import InteractionServer
+
+KEY = SigningKey.generate()
+
+
+class State:
+    """Stands in for the bot's connection state, answering every command the
+    way a command handler would, through the webhook adapter in context"""
+
+    def __init__(self, respond: bool = True):
+        self.respond = respond
+        self.returned: List[Dict[str, Any]] = []
+
+    def parse_interaction_create(self, payload: Dict[str, Any]) -> None:
+        if self.respond:
+            asyncio.get_running_loop().create_task(self.reply(payload))
+
+    async def reply(self, payload: Dict[str, Any]) -> None:
+        params = MultipartParameters(
+            payload={"type": 4, "data": {"content": f"Ran {payload['data']['name']}"}},
+            multipart=None,
+            files=None,
+        )
+        self.returned.append(
+            await async_context.get().create_interaction_response(
+                int(payload["id"]), payload["token"], params=params
+            )
+        )
+
+
+class Bot:
+    def __init__(self, state: State):
+        self._connection = state
+
+
+def sign(body: bytes, timestamp: Optional[str] = None) -> Dict[str, str]:
+    timestamp = timestamp or str(int(time.time()))
+    signed = KEY.sign(timestamp.encode() + body)
+    return {
+        "X-Signature-Ed25519": signed.signature.hex(),
+        "X-Signature-Timestamp": timestamp,
+    }
+
+
+async def serve(state: State) -> TestClient:
+    server = InteractionServer(
+        Bot(state), KEY.verify_key.encode().hex()  # type: ignore
+    )
+    client = TestClient(TestServer(server.app()))
+    await client.start_server()
+    return client
+
+
+COMMAND = json.dumps(
+    {"id": "1", "type": 2, "token": "token", "data": {"name": "tags"}}
+).encode()
+
+
+def test_rejects_bad_signatures():
+    async def main():
+        client = await serve(State())
+        forged = {**sign(COMMAND), "X-Signature-Ed25519": "00" * 64}
+        stale = sign(COMMAND, str(int(time.time()) - webhook.MAX_CLOCK_SKEW - 10))
+
+        try:
+            for headers in ({}, forged, stale, sign(b"{}")):
+                response = await client.post(
+                    "/interactions", data=COMMAND, headers=headers
+                )
+                assert response.status == 401
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_answers_pings():
+    async def main():
+        client = await serve(State())
+        body = json.dumps({"id": "1", "type": 1}).encode()
+
+        try:
+            response = await client.post("/interactions", data=body, headers=sign(body))
+            assert response.status == 200
+            assert await response.json() == {"type": 1}
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_dispatches_commands_and_returns_their_response():
+    async def main():
+        state = State()
+        client = await serve(state)
+
+        try:
+            response = await client.post(
+                "/interactions", data=COMMAND, headers=sign(COMMAND)
+            )
+            assert response.status == 200
+            assert await response.json() == {
+                "type": 4,
+                "data": {"content": "Ran tags"},
+            }
+
+            # The command is only told it responded once Discord has it.
+            await asyncio.sleep(0.01)
+            assert state.returned == [{"interaction": {"id": "1", "type": 4}}]
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_gives_up_on_commands_that_never_respond(monkeypatch):
+    monkeypatch.setattr(webhook, "RESPONSE_TIMEOUT", 0.05)
+
+    async def main():
+        client = await serve(State(respond=False))
+
+        try:
+            response = await client.post(
+                "/interactions", data=COMMAND, headers=sign(COMMAND)
+            )
+            assert response.status == 500
+        finally:
+            await client.close()
+
+    asyncio.run(main())